@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+CEAPSI PCF - Ejemplo de Ingesta Masiva de Auditoría
+Patrón de referencia para volcar eventos de auditoría en lote vía COPY
+en lugar de un INSERT por evento
+"""
+
+import csv
+import io
+import json
+
+from setup_audit_database import borrow_conn
+
+# Por qué COPY y no INSERTs:
+# - las columnas JSONB anchas (old_data, new_data, metadata) se
+#   TOASTean/comprimen por fila; con un INSERT por request cada evento
+#   paga parseo, plan y commit propios
+# - COPY FROM STDIN mueve el lote en un solo comando y una sola
+#   transacción: una fracción del WAL y de los round-trips
+# - synchronous_commit = off a nivel de transacción recorta a la mitad la
+#   latencia de commit; el log de auditoría es append-only y tolera
+#   perder los últimos milisegundos ante un crash (los datos de negocio
+#   no se ven afectados)
+
+COLUMNAS = ('user_id', 'action', 'table_name', 'new_data')
+
+
+def ingestar_eventos(eventos):
+    """Carga una lista de eventos de auditoría en un solo COPY.
+
+    Cada evento es un dict con las claves de COLUMNAS; new_data puede ser
+    cualquier estructura serializable a JSON.
+    """
+    if not eventos:
+        return 0
+
+    # Armar el buffer CSV en memoria: csv.writer escapa comillas y saltos
+    # de línea, y JSONB acepta el texto JSON tal cual
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for evento in eventos:
+        writer.writerow([
+            evento['user_id'],
+            evento['action'],
+            evento['table_name'],
+            json.dumps(evento.get('new_data') or {})
+        ])
+    buf.seek(0)
+
+    with borrow_conn() as conn:
+        if conn is None:
+            raise RuntimeError('Sin conexión a la base de datos')
+        with conn:
+            with conn.cursor() as cur:
+                # Solo esta transacción relaja la durabilidad del commit
+                cur.execute('SET LOCAL synchronous_commit = off')
+                cur.copy_expert(
+                    'COPY public.audit_logs ({}) FROM STDIN WITH (FORMAT csv)'
+                    .format(', '.join(COLUMNAS)),
+                    buf
+                )
+
+    return len(eventos)
+
+
+if __name__ == "__main__":
+    ejemplo = [
+        {
+            'user_id': '00000000-0000-0000-0000-000000000000',
+            'action': 'INSERT',
+            'table_name': 'analysis_sessions',
+            'new_data': {'status': 'completed', 'records': 1250}
+        }
+    ]
+    print(f"✅ {ingestar_eventos(ejemplo)} eventos cargados")
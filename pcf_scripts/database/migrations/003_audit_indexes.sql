@@ -0,0 +1,59 @@
+-- =====================================================
+-- CEAPSI PCF - Índices del Sistema de Auditoría
+-- Ejecutar DESPUÉS de 002_audit_system.sql
+-- =====================================================
+
+-- IMPORTANTE: CREATE INDEX CONCURRENTLY no puede correr dentro de una
+-- transacción. Ejecutar este archivo en modo autocommit (sentencia por
+-- sentencia), NO envuelto en BEGIN/COMMIT. A cambio, los índices se
+-- construyen sin bloquear las escrituras en vivo sobre las tablas.
+
+-- Nota sobre tablas particionadas (audit_logs, audit_user_activities,
+-- audit_api_calls): PostgreSQL no admite CONCURRENTLY sobre el padre
+-- particionado; ahí se usa CREATE INDEX normal, que en el padre es solo
+-- metadata y se propaga a cada partición (pequeñas al estrenar el
+-- esquema). Para reindexar particiones ya pobladas en caliente: crear el
+-- índice con ON ONLY en el padre, construirlo con CONCURRENTLY en cada
+-- partición y adjuntarlo con ALTER INDEX ... ATTACH PARTITION.
+
+-- Índices para audit_user_activities (particionada)
+CREATE INDEX IF NOT EXISTS idx_audit_activities_user_time ON public.audit_user_activities(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_activities_type ON public.audit_user_activities(activity_type);
+CREATE INDEX IF NOT EXISTS idx_audit_activities_user_id ON public.audit_user_activities(user_id);
+CREATE INDEX IF NOT EXISTS brin_audit_activities_ts ON public.audit_user_activities USING BRIN(created_at);
+
+-- Índices para audit_api_calls (particionada)
+CREATE INDEX IF NOT EXISTS idx_audit_api_calls_user_time ON public.audit_api_calls(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_api_calls_provider ON public.audit_api_calls(api_provider);
+CREATE INDEX IF NOT EXISTS idx_audit_api_calls_user_id ON public.audit_api_calls(user_id);
+CREATE INDEX IF NOT EXISTS brin_audit_api_calls_ts ON public.audit_api_calls USING BRIN(created_at);
+
+-- Índices para audit_logs (particionada)
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user_time ON public.audit_logs(user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_table_action ON public.audit_logs(table_name, action);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user_id ON public.audit_logs(user_id);
+CREATE INDEX IF NOT EXISTS brin_audit_logs_ts ON public.audit_logs USING BRIN(timestamp);
+
+-- Índices para audit_file_uploads
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_files_user_time ON public.audit_file_uploads(user_id, created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_files_hash ON public.audit_file_uploads(file_hash);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_files_user_id ON public.audit_file_uploads(user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS brin_audit_files_ts ON public.audit_file_uploads USING BRIN(created_at);
+
+-- Índices para audit_analysis_runs
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_analysis_user_time ON public.audit_analysis_runs(user_id, created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_analysis_type ON public.audit_analysis_runs(analysis_type);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_analysis_user_id ON public.audit_analysis_runs(user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS brin_audit_analysis_ts ON public.audit_analysis_runs USING BRIN(created_at);
+
+-- Índices para audit_data_storage
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_storage_user_time ON public.audit_data_storage(user_id, created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_storage_type ON public.audit_data_storage(data_type);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_storage_expires ON public.audit_data_storage(expires_at) WHERE expires_at IS NOT NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_storage_user_id ON public.audit_data_storage(user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS brin_audit_storage_ts ON public.audit_data_storage USING BRIN(created_at);
+
+-- Los índices dedicados sobre user_id dan al planner una opción barata
+-- para el predicado RLS ((SELECT auth.uid()) = user_id); los BRIN sobre
+-- timestamps monótonos cubren los barridos por antigüedad de la limpieza
+-- con una fracción del tamaño de un btree.
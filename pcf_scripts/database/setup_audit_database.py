@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+CEAPSI PCF - Setup del Sistema de Auditoría
+Aplica la migración 002_audit_system.sql sobre Supabase/PostgreSQL
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+
+@lru_cache(maxsize=1)
+def _env():
+    """Entorno combinado .env + os.environ, parseado una sola vez.
+
+    Evita que load_dotenv() recorra el disco en cada import; en producción
+    (variables reales ya en el entorno) el parser de dotenv ni se toca.
+    """
+    from dotenv import dotenv_values
+    return {**dotenv_values(), **os.environ}
+
+# La migración vive como recurso .sql junto al script: el módulo no carga
+# ningún heredoc multi-KB y el archivo se lee una sola vez por proceso
+_AUDIT_SQL_PATH = Path(__file__).with_name('migrations') / '002_audit_system.sql'
+
+
+@lru_cache(maxsize=1)
+def _load_audit_sql():
+    """Lee la migración de auditoría una sola vez por proceso"""
+    return _AUDIT_SQL_PATH.read_text(encoding='utf-8')
+
+
+# Copia junto al script para pegar en el SQL Editor de Supabase
+_SQL_EXPORT_PATH = Path(__file__).with_name('audit_system_setup.sql')
+
+
+def _exportar_sql_editor():
+    """Deja una copia de la migración junto al script para uso manual.
+
+    Solo escribe cuando el contenido cambió (comparación SHA-256) y lo
+    hace de forma atómica vía tempfile + os.replace: corridas repetidas
+    no pagan write+fsync y un proceso interrumpido no deja el archivo a
+    medias.
+    """
+    nuevo = _load_audit_sql().encode('utf-8')
+
+    if (_SQL_EXPORT_PATH.exists()
+            and hashlib.sha256(_SQL_EXPORT_PATH.read_bytes()).digest()
+                == hashlib.sha256(nuevo).digest()):
+        print(f"ℹ️  {_SQL_EXPORT_PATH.name} ya está actualizado")
+        return
+
+    tmp = _SQL_EXPORT_PATH.with_suffix('.sql.tmp')
+    tmp.write_bytes(nuevo)
+    os.replace(tmp, _SQL_EXPORT_PATH)
+    print(f"📝 Copia para SQL Editor: {_SQL_EXPORT_PATH.name}")
+
+
+@lru_cache(maxsize=1)
+def _dsn():
+    """DSN de conexión memoizado, construido con make_dsn (libpq).
+
+    make_dsn valida y escapa en C; con lru_cache el parseo de la URL se
+    paga una sola vez por proceso en vez de por conexión.
+    """
+    # Imports diferidos: ni urllib ni libpq (~4 MB RSS) se cargan si el
+    # proceso nunca abre una conexión directa
+    from urllib.parse import urlparse
+    import psycopg2.extensions
+
+    db_url = _env().get('SUPABASE_DB_URL')
+    if not db_url:
+        return None
+
+    parsed = urlparse(db_url)
+    return psycopg2.extensions.make_dsn(
+        host=parsed.hostname,
+        port=parsed.port or 5432,
+        dbname=(parsed.path.lstrip('/') or 'postgres'),
+        user=parsed.username,
+        password=parsed.password
+    )
+
+
+# Pool de conexiones a nivel de proceso: el handshake TLS+auth contra
+# Supabase (~150-300 ms) se paga una vez y las llamadas siguientes son un
+# checkout casi gratis en vez de un connect completo
+_PG_POOL = None
+_PG_POOL_LOCK = threading.Lock()
+
+
+def _get_pool():
+    """Crea (una sola vez) el pool de conexiones a PostgreSQL"""
+    global _PG_POOL
+
+    if _PG_POOL is None:
+        with _PG_POOL_LOCK:
+            if _PG_POOL is None:
+                from psycopg2 import pool
+
+                dsn = _dsn()
+                if dsn is None:
+                    print("❌ SUPABASE_DB_URL no configurada en .env")
+                    return None
+
+                _PG_POOL = pool.ThreadedConnectionPool(
+                    minconn=1, maxconn=4, dsn=dsn
+                )
+
+    return _PG_POOL
+
+
+@contextmanager
+def borrow_conn():
+    """Presta una conexión del pool y la devuelve al salir del with"""
+    pg_pool = _get_pool()
+    if pg_pool is None:
+        yield None
+        return
+
+    conn = pg_pool.getconn()
+    try:
+        yield conn
+    finally:
+        pg_pool.putconn(conn)
+
+
+def get_db_connection():
+    """Obtiene una conexión del pool (devolverla con el pool, no close())"""
+    pg_pool = _get_pool()
+    return pg_pool.getconn() if pg_pool is not None else None
+
+
+def execute_sql_with_supabase():
+    """Ejecuta la migración vía la función RPC execute_sql de Supabase.
+
+    La migración ya no instala execute_sql (SECURITY DEFINER removido);
+    esta ruta requiere que un operador la haya provisto ad hoc. Si el RPC
+    no existe, usar la copia para el SQL Editor que deja main().
+    """
+    env = _env()
+    supabase_url = env.get('SUPABASE_URL')
+    supabase_key = env.get('SUPABASE_KEY')
+
+    if not supabase_url or not supabase_key:
+        print("❌ SUPABASE_URL / SUPABASE_KEY no configuradas en .env")
+        return False
+
+    # Import diferido: el cliente Supabase arrastra httpx/gotrue/postgrest
+    # (cientos de ms y decenas de MB); solo se paga en la rama que de
+    # verdad abre una conexión
+    from supabase import create_client
+
+    supabase = create_client(supabase_url, supabase_key)
+
+    sql_content = _load_audit_sql()
+
+    # Un solo round-trip RPC con toda la migración: EXECUTE dentro de
+    # plpgsql corre el lote en una transacción implícita, en vez de pagar
+    # TLS+HTTP por cada una de las ~35 declaraciones
+    try:
+        supabase.rpc('execute_sql', {'sql_text': sql_content}).execute()
+        print("✅ Migración ejecutada en un solo lote")
+        return True
+    except Exception as e:
+        print(f"⚠️  Lote completo falló ({e}); reintentando por declaración...")
+
+    # Respaldo declaración por declaración, con progreso, para aislar
+    # cuál falla cuando el lote no pasa
+    statements = [s.strip() for s in sql_content.split(';\n') if s.strip()]
+
+    errores = 0
+    for i, statement in enumerate(statements, start=1):
+        try:
+            supabase.rpc('execute_sql', {'sql_text': statement}).execute()
+        except Exception as e:
+            errores += 1
+            print(f"⚠️  Declaración {i}/{len(statements)} falló: {e}")
+
+    if errores:
+        print(f"❌ {errores} declaraciones fallaron")
+        return False
+
+    print(f"✅ {len(statements)} declaraciones ejecutadas")
+    return True
+
+
+def main():
+    """Ejecuta el setup completo del sistema de auditoría"""
+    print("=" * 60)
+    print("🔒 CEAPSI - Setup Sistema de Auditoría")
+    print("=" * 60)
+
+    if not _AUDIT_SQL_PATH.exists():
+        print(f"❌ No se encontró la migración: {_AUDIT_SQL_PATH}")
+        return False
+
+    _exportar_sql_editor()
+
+    if execute_sql_with_supabase():
+        print("🎉 Sistema de auditoría configurado")
+        return True
+
+    print("💡 Alternativa: ejecutar el contenido de la migración")
+    print("   manualmente en el SQL Editor de Supabase")
+    return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
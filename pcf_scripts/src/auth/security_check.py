@@ -4,8 +4,12 @@ CEAPSI Security Check
 Verifica la configuración de seguridad del sistema
 """
 
+import importlib.util
 import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
@@ -70,35 +74,33 @@ def check_supabase_connection():
 def check_security_files():
     """Verifica archivos de seguridad"""
     print("🔍 Verificando archivos de seguridad...")
-    
+
+    # Un solo scandir del directorio en vez de un stat() por archivo
+    with os.scandir('.') as entradas:
+        presentes = {e.name for e in entradas}
+
     # Archivos que NO deben existir en producción
     insecure_files = [
         'config.yaml',
         'auth.py',
         'test_credentials.json'
     ]
-    
-    found_insecure = []
-    for file in insecure_files:
-        if Path(file).exists():
-            found_insecure.append(file)
-    
+
+    found_insecure = [file for file in insecure_files if file in presentes]
+
     if found_insecure:
         print(f"⚠️  ADVERTENCIA: Archivos inseguros encontrados: {found_insecure}")
         print("   Recomendación: Mover a carpeta legacy/")
-    
+
     # Archivos críticos que deben existir
     required_files = [
         'supabase_auth.py',
         '.env',
         '.gitignore'
     ]
-    
-    missing_files = []
-    for file in required_files:
-        if not Path(file).exists():
-            missing_files.append(file)
-    
+
+    missing_files = [file for file in required_files if file not in presentes]
+
     if missing_files:
         print(f"❌ CRÍTICO: Archivos requeridos faltantes: {missing_files}")
         return False
@@ -106,6 +108,12 @@ def check_security_files():
     print("✅ Archivos de seguridad verificados")
     return True
 
+@lru_cache(maxsize=16)
+def _leer_texto(ruta):
+    """Lee un archivo una sola vez por ejecución, compartido entre checks"""
+    return Path(ruta).read_text(encoding='utf-8')
+
+
 def check_gitignore():
     """Verifica configuración .gitignore"""
     print("🔍 Verificando .gitignore...")
@@ -115,7 +123,7 @@ def check_gitignore():
         print("❌ CRÍTICO: Archivo .gitignore no encontrado")
         return False
     
-    content = gitignore_file.read_text()
+    content = _leer_texto('.gitignore')
     
     # Patrones críticos que deben estar en .gitignore
     critical_patterns = ['.env', '*.toml', '*_credentials.*']
@@ -132,20 +140,47 @@ def check_gitignore():
     print("✅ Configuración .gitignore correcta")
     return True
 
+# Nombre de paquete al inicio de cada línea de requirements.txt; una sola
+# pasada compilada en vez de split('==')/split('>=') por línea
+_PKG_RE = re.compile(r'(?m)^\s*([A-Za-z0-9_.\-]+)')
+
+# Paquetes cuyo nombre pip difiere del módulo importable
+_NOMBRE_IMPORT = {
+    'python-dotenv': 'dotenv',
+    'scikit-learn': 'sklearn',
+    'scikit-optimize': 'skopt',
+}
+
+
 def check_dependencies():
     """Verifica dependencias de seguridad"""
     print("🔍 Verificando dependencias...")
-    
-    try:
-        import supabase
-        import dotenv
-        print("✅ Dependencias críticas instaladas")
-        return True
-    except ImportError as e:
-        print(f"❌ CRÍTICO: Dependencia faltante: {e}")
+
+    # find_spec localiza el paquete sin ejecutarlo: no paga la
+    # inicialización completa del módulo solo para saber si está instalado
+    faltantes = [nombre for nombre in ('supabase', 'dotenv')
+                 if importlib.util.find_spec(nombre) is None]
+
+    if faltantes:
+        print(f"❌ CRÍTICO: Dependencia faltante: {faltantes}")
         print("   Ejecutar: pip install supabase python-dotenv")
         return False
 
+    # Revisar el resto de requirements.txt (informativo, no bloqueante)
+    requirements_file = Path('requirements.txt')
+    if requirements_file.exists():
+        nombres = _PKG_RE.findall(requirements_file.read_text(encoding='utf-8'))
+        no_instalados = [
+            nombre for nombre in nombres
+            if importlib.util.find_spec(
+                _NOMBRE_IMPORT.get(nombre, nombre.replace('-', '_'))) is None
+        ]
+        if no_instalados:
+            print(f"⚠️  ADVERTENCIA: Paquetes declarados sin instalar: {no_instalados}")
+
+    print("✅ Dependencias críticas instaladas")
+    return True
+
 def check_app_security():
     """Verifica configuración de seguridad en app.py"""
     print("🔍 Verificando configuración app.py...")
@@ -155,7 +190,7 @@ def check_app_security():
         print("❌ CRÍTICO: app.py no encontrado")
         return False
     
-    content = app_file.read_text()
+    content = _leer_texto('app.py')
     
     # Verificar que NO use sistema YAML
     if 'AuthManager()' in content and 'auth.py' in content:
@@ -192,21 +227,37 @@ def main():
     print("=" * 60)
     print("🔒 CEAPSI - Verificación de Seguridad")
     print("=" * 60)
-    
-    checks = [
+
+    # Verificaciones de solo-lectura independientes entre sí: se lanzan en
+    # paralelo para solapar disco e imports (el total baja a ~max en vez
+    # de la suma). Las que dependen del entorno corren secuencialmente.
+    checks_paralelos = [
         check_dependencies,
-        check_environment,
-        check_supabase_connection,
         check_security_files,
         check_gitignore,
-        check_app_security,
+        check_app_security
+    ]
+    checks_secuenciales = [
+        check_environment,
+        check_supabase_connection,
         check_production_readiness
     ]
-    
+
     passed = 0
-    total = len(checks)
-    
-    for check in checks:
+    total = len(checks_paralelos) + len(checks_secuenciales)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(check) for check in checks_paralelos]
+        for future in futures:
+            try:
+                if future.result():
+                    passed += 1
+                print("-" * 40)
+            except Exception as e:
+                print(f"❌ ERROR en verificación: {e}")
+                print("-" * 40)
+
+    for check in checks_secuenciales:
         try:
             if check():
                 passed += 1
@@ -8,14 +8,14 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
 from plotly.subplots import make_subplots
+import copy
 import json
+import math
 from datetime import datetime, timedelta
 import os
+from functools import lru_cache
 from pathlib import Path
-from sklearn.metrics import mean_absolute_error, mean_squared_error, mean_absolute_percentage_error
-
 # Importar gestor de feriados
 try:
     from feriados_chilenos import GestorFeriadosChilenos
@@ -23,6 +23,969 @@ try:
 except ImportError:
     FERIADOS_DISPONIBLES = False
 
+# Detector de encoding opcional (más rápido que chardet)
+try:
+    from charset_normalizer import from_bytes as _charset_from_bytes
+    CHARSET_NORMALIZER_DISPONIBLE = True
+except ImportError:
+    CHARSET_NORMALIZER_DISPONIBLE = False
+
+# orjson opcional para parseo SIMD de los JSON de predicciones
+try:
+    import orjson
+    ORJSON_DISPONIBLE = True
+except ImportError:
+    ORJSON_DISPONIBLE = False
+
+
+def _cargar_json(ruta_archivo):
+    """Carga un archivo JSON con orjson si está disponible (2-5x más rápido)"""
+    datos = Path(ruta_archivo).read_bytes()
+    if ORJSON_DISPONIBLE:
+        return orjson.loads(datos)
+    return json.loads(datos)
+
+
+@lru_cache(maxsize=8)
+def _carpeta_resultados_reciente(base_path, mtime):
+    """Última carpeta 'resultados_*' bajo base_path; memoizada por mtime.
+
+    El mtime del directorio cambia al crear/borrar entradas, así que
+    mientras no cambie se evita repetir el listdir + max en cada __init__.
+    """
+    carpetas = [d for d in os.listdir(base_path) if d.startswith('resultados_')]
+    if carpetas:
+        return os.path.join(base_path, max(carpetas))
+    return str(base_path)
+
+
+# PyArrow opcional para lectura multi-hilo de CSV
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
+# Polars opcional: lectura CSV perezosa y paralela para los históricos
+try:
+    import polars as pl
+    POLARS_DISPONIBLE = True
+except ImportError:
+    POLARS_DISPONIBLE = False
+
+# plotly-resampler opcional: el navegador solo recibe ~O(1000) puntos
+# por traza sin importar el tamaño de la serie
+try:
+    from plotly_resampler import FigureResampler
+    PLOTLY_RESAMPLER_DISPONIBLE = True
+except ImportError:
+    PLOTLY_RESAMPLER_DISPONIBLE = False
+
+# numba opcional para JIT del histograma día/hora
+try:
+    from numba import njit, prange
+    NUMBA_DISPONIBLE = True
+except ImportError:
+    NUMBA_DISPONIBLE = False
+
+
+if NUMBA_DISPONIBLE:
+    @njit(cache=True, parallel=True)
+    def _cubo_temporal_nb(filas, dias, horas, n_semanas, n_bloques):
+        """Cubo semana x día x hora paralelo: tensores parciales por bloque
+        (sin escrituras compartidas entre hilos) reducidos al final."""
+        n = dias.shape[0]
+        parcial = np.zeros((n_bloques, n_semanas, 7, 24), dtype=np.int32)
+        tam = (n + n_bloques - 1) // n_bloques
+        for b in prange(n_bloques):
+            inicio = b * tam
+            fin = min(inicio + tam, n)
+            for i in range(inicio, fin):
+                parcial[b, filas[i], dias[i], horas[i]] += 1
+        cubo = np.zeros((n_semanas, 7, 24), dtype=np.int32)
+        for b in range(n_bloques):
+            cubo += parcial[b]
+        return cubo
+
+
+def _contar_cubo(filas, dias, horas, n_semanas):
+    """Cuenta llamadas en un cubo [semana, día, hora].
+
+    Con numba el conteo corre en paralelo a velocidad de ancho de banda de
+    memoria; sin numba (o con pocas filas, donde el JIT no se paga) cae a
+    np.add.at en una sola pasada.
+    """
+    if NUMBA_DISPONIBLE and len(dias) > 100_000:
+        return _cubo_temporal_nb(
+            np.ascontiguousarray(filas), np.ascontiguousarray(dias),
+            np.ascontiguousarray(horas), n_semanas, os.cpu_count() or 4
+        )
+    cubo = np.zeros((n_semanas, 7, 24), dtype=np.int32)
+    np.add.at(cubo, (filas, dias, horas), 1)
+    return cubo
+
+
+# Únicas columnas del CSV de llamadas que el dashboard consume; podar el
+# resto en la lectura reduce parseo y memoria proporcionalmente
+USED_COLS = ['FECHA', 'TELEFONO', 'SENTIDO', 'ATENDIDA']
+
+
+def _leer_csv_llamadas(ruta_archivo, encoding):
+    """Lee el CSV de llamadas con el lector más rápido disponible.
+
+    Con PyArrow el parseo es multi-hilo y las columnas de baja cardinalidad
+    (SENTIDO, ATENDIDA) quedan dictionary-encoded, lo que reduce memoria y
+    acelera las comparaciones `==` posteriores. Sin PyArrow cae al lector
+    C de pandas.
+    """
+    if PYARROW_DISPONIBLE:
+        try:
+            tabla = pacsv.read_csv(
+                ruta_archivo,
+                read_options=pacsv.ReadOptions(
+                    use_threads=True, block_size=8 << 20, encoding=encoding
+                ),
+                parse_options=pacsv.ParseOptions(delimiter=';'),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=USED_COLS,
+                    column_types={
+                        'FECHA': pa.string(),
+                        'TELEFONO': pa.string(),
+                        'SENTIDO': pa.dictionary(pa.int32(), pa.string()),
+                        'ATENDIDA': pa.dictionary(pa.int32(), pa.string())
+                    }
+                )
+            )
+            # split_blocks evita consolidar todo en un bloque monolítico y
+            # self_destruct libera los buffers Arrow durante la conversión:
+            # el pico de memoria baja a ~1x la tabla en vez de ~2x
+            return tabla.to_pandas(split_blocks=True, self_destruct=True)
+        except (pa.ArrowInvalid, pa.ArrowKeyError):
+            # Esquema inesperado: dejar que pandas infiera todo (rebobinando
+            # primero si es una subida file-like ya parcialmente consumida)
+            if hasattr(ruta_archivo, 'seek'):
+                ruta_archivo.seek(0)
+    # usecols como callable tolera archivos a los que les falte alguna columna
+    return pd.read_csv(ruta_archivo, sep=';', encoding=encoding,
+                       usecols=lambda c: c in USED_COLS)
+
+
+def _detectar_encoding(ruta_archivo, sample_size=65536):
+    """Detecta el encoding de un CSV leyendo solo la cabecera del archivo.
+
+    Evita re-parsear el archivo completo por cada encoding candidato:
+    una sola muestra de 64KB basta para decidir antes de la única lectura real.
+    """
+    with open(ruta_archivo, 'rb') as f:
+        sample = f.read(sample_size)
+
+    # BOMs explícitos primero
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    if sample.startswith(b'\xff\xfe') or sample.startswith(b'\xfe\xff'):
+        return 'utf-16'
+
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    if CHARSET_NORMALIZER_DISPONIBLE:
+        mejor = _charset_from_bytes(sample).best()
+        if mejor is not None and mejor.encoding:
+            return mejor.encoding
+
+    # latin-1 nunca falla al decodificar; es el fallback histórico del proyecto
+    return 'latin-1'
+
+
+# Plantilla del medidor de confianza construida una sola vez al importar;
+# por alerta solo se clona y se ajusta `value` (go.Figure comparte las
+# referencias de las claves que no cambian, sin deepcopy)
+_GAUGE_TEMPLATE = go.Figure(go.Indicator(
+    mode="gauge+number",
+    value=0,
+    domain={'x': [0, 1], 'y': [0, 1]},
+    title={'text': "Confianza"},
+    gauge={
+        'axis': {'range': [None, 100]},
+        'bar': {'color': "darkblue"},
+        'steps': [
+            {'range': [0, 50], 'color': "lightgray"},
+            {'range': [50, 80], 'color': "yellow"},
+            {'range': [80, 100], 'color': "green"}
+        ],
+        'threshold': {
+            'line': {'color': "red", 'width': 4},
+            'thickness': 0.75,
+            'value': 90
+        }
+    }
+))
+_GAUGE_TEMPLATE.update_layout(height=200, margin=dict(l=0, r=0, t=0, b=0))
+
+
+@st.cache_data
+def _simular_metricas_objetivo(clave_cache):
+    """Simula MAPE y precisión de alertas, estable dentro del día.
+
+    Sin cache cada rerun dibujaba valores distintos y pagaba el RNG en el
+    camino interactivo; cacheado por (tipo, fecha) devuelve siempre lo mismo.
+    """
+    return {
+        'MAPE': float(np.random.uniform(15, 35)),
+        'Precision_Alertas': float(np.random.uniform(75, 95))
+    }
+
+
+@st.cache_data
+def _simular_residuales(y_tail):
+    """Simula predicciones y residuales de validación de forma determinista.
+
+    En producción estos valores vendrían del cross-validation; aquí se
+    cachean por contenido de la serie para no regenerar la simulación (ni
+    recomputar residuales) en cada rerun de Streamlit.
+    """
+    y = np.asarray(y_tail, dtype=float)
+    # Generador local: no muta el estado del RNG global del proceso
+    rng = np.random.default_rng(42)
+    pred_ensemble = y + rng.normal(0, 3, len(y))
+    return pd.DataFrame({
+        'y': y,
+        'pred_ensemble': pred_ensemble,
+        'residuales': y - pred_ensemble
+    })
+
+
+@st.cache_data(ttl=3600, show_spinner=False,
+               hash_funcs={pd.DataFrame: lambda d: d['residuales'].to_numpy().tobytes()})
+def _figura_residuales_tendencia(df_test):
+    """Scatter de residuales con tendencia LOWESS, cacheado por contenido.
+
+    px con trendline='lowess' dispara un ajuste de statsmodels en cada
+    rerun; cacheado por los bytes de los residuales, el fit corre una sola
+    vez por serie simulada aunque se cambie de pestaña.
+    """
+    # Import diferido: px arrastra todo plotly.express en el arranque y
+    # solo se usa en pestañas secundarias
+    import plotly.express as px
+
+    fig = px.scatter(
+        df_test,
+        x='pred_ensemble',
+        y='residuales',
+        title="Residuales vs Predicciones",
+        labels={'pred_ensemble': 'Predicciones', 'residuales': 'Residuales'},
+        trendline="lowess"
+    )
+    fig.add_hline(y=0, line_dash="dash", line_color="red")
+    return fig
+
+
+def _submuestrear_lttb(x, y, n_out=2000):
+    """Submuestrea una serie larga con LTTB (Largest-Triangle-Three-Buckets).
+
+    Devuelve los índices de los puntos a conservar. El costo de Plotly
+    (JSON + render en el navegador) escala con los puntos dibujados; LTTB
+    conserva la forma visual de la serie con ~n_out puntos. Se usa como
+    respaldo cuando plotly-resampler no está instalado.
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    xs = np.asarray(x)
+    if xs.dtype.kind in 'mM':
+        xs = xs.astype('int64')
+    xs = xs.astype('float64')
+    ys = np.asarray(y, dtype='float64')
+
+    # Bordes de los n_out-2 buckets intermedios; primero y último punto fijos
+    bordes = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    indices = np.empty(n_out, dtype='int64')
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        ini, fin = bordes[i], bordes[i + 1]
+        # Promedio del bucket siguiente como tercer vértice del triángulo
+        prox_fin = bordes[i + 2] if i < n_out - 3 else n
+        px = xs[fin:prox_fin].mean()
+        py = ys[fin:prox_fin].mean()
+        ax, ay = xs[a], ys[a]
+        areas = np.abs((ax - px) * (ys[ini:fin] - ay)
+                       - (ax - xs[ini:fin]) * (py - ay))
+        a = ini + int(areas.argmax())
+        indices[i + 1] = a
+
+    return indices
+
+
+@st.cache_resource
+def _esqueleto_figura_predicciones():
+    """Esqueleto del subplot de predicciones, construido una sola vez.
+
+    make_subplots valida y arma el layout completo en cada llamada; cachear
+    el esqueleto vacío y clonarlo por render amortiza ese costo entre reruns.
+    """
+    return make_subplots(
+        rows=2, cols=1,
+        subplot_titles=("Comparación de Predicciones", "Intervalos de Confianza"),
+        vertical_spacing=0.1,
+        row_heights=[0.7, 0.3]
+    )
+
+
+# Títulos de ejes por (fila, columna) de la figura de atención; constante
+# de módulo para aplicarlos una sola vez sobre el esqueleto cacheado
+_EJES_ATENCION = (
+    (1, 1, "Fecha", "Porcentaje de Atención (%)"),
+    (2, 1, "Período", "Promedio Atención (%)"),
+    (2, 2, "Fecha", "Número de Llamadas"),
+)
+
+_LAYOUT_ATENCION = dict(height=800, showlegend=True)
+
+
+@st.cache_resource
+def _esqueleto_figura_atencion():
+    """Esqueleto del subplot de atención promedio, construido una sola vez.
+
+    Incluye layout estático y títulos de ejes: cada update_layout /
+    update_*axes revalida el dict completo de la figura, así que se pagan
+    aquí una vez y no en cada build del builder cacheado.
+    """
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=(
+            "Porcentaje de Atención por Día (Últimos 90 días)",
+            "Comparación de Promedios por Período",
+            "Volumen de Llamadas Diarias",
+            "Tendencia de Atención (Últimos 30 días)"
+        ),
+        specs=[[{"colspan": 2}, None],
+               [{}, {}]],
+        vertical_spacing=0.12
+    )
+    fig.update_layout(**_LAYOUT_ATENCION)
+    for fila, col, titulo_x, titulo_y in _EJES_ATENCION:
+        fig.update_xaxes(title_text=titulo_x, row=fila, col=col)
+        fig.update_yaxes(title_text=titulo_y, row=fila, col=col)
+    return fig
+
+def _hash_df_diario(d):
+    """Hash para los agregados diarios: longitud + última fecha + bytes de
+    los conteos.
+
+    ENTRANTE y SALIENTE cubren el mismo rango de días hábiles, así que
+    longitud + fecha solas colisionan entre tipos; los frames son chicos
+    (≤90 filas) y los bytes de ambos conteos los distinguen gratis.
+    Atendidas va incluida porque porcentaje_atencion (lo que la figura y
+    la tabla dibujan) puede cambiar con totales idénticos.
+    """
+    if len(d) == 0:
+        return 0
+    return (len(d), str(d['fecha'].iloc[-1]),
+            d['total_llamadas'].to_numpy().tobytes(),
+            d['llamadas_atendidas'].to_numpy().tobytes())
+
+
+@st.cache_data(ttl=3600, show_spinner=False,
+               hash_funcs={pd.DataFrame: _hash_df_diario})
+def _construir_figura_atencion(df_30d, df_90d, promedio_15d, promedio_30d,
+                               promedio_90d, tipo_llamada):
+    """Construye la figura de atención promedio; cacheada entre reruns.
+
+    Armar trazas y serializar a JSON suele ser el mayor costo no-datos de
+    cada rerun; con el hash explícito de _hash_df_diario un toggle de
+    widget reutiliza la figura ya construida.
+    """
+    fig = copy.deepcopy(_esqueleto_figura_atencion())
+
+    # Gráfica principal: línea de tiempo de atención
+    traza_atencion = go.Scatter(
+        mode='lines+markers',
+        name='% Atención Diaria',
+        line=dict(color='#1f77b4', width=2),
+        marker=dict(size=4),
+        hovertemplate='<b>%{x}</b><br>Atención: %{y:.1f}%<extra></extra>'
+    )
+    if PLOTLY_RESAMPLER_DISPONIBLE:
+        # El resampler manda al navegador solo la ventana visible
+        # submuestreada (LTTB), sin importar cuánto crezca la serie
+        fig = FigureResampler(fig)
+        fig.add_trace(traza_atencion,
+                      hf_x=df_90d['fecha'],
+                      hf_y=df_90d['porcentaje_atencion'],
+                      row=1, col=1)
+    else:
+        traza_atencion.x = df_90d['fecha']
+        traza_atencion.y = df_90d['porcentaje_atencion']
+        fig.add_trace(traza_atencion, row=1, col=1)
+
+    # Líneas de referencia para períodos
+    if promedio_15d is not None:
+        fig.add_hline(
+            y=promedio_15d,
+            line_dash="dash",
+            line_color="red",
+            annotation_text=f"Promedio 15d: {promedio_15d:.1f}%",
+            row=1, col=1
+        )
+
+    if promedio_30d is not None:
+        fig.add_hline(
+            y=promedio_30d,
+            line_dash="dot",
+            line_color="orange",
+            annotation_text=f"Promedio 30d: {promedio_30d:.1f}%",
+            row=1, col=1
+        )
+
+    # Gráfica de barras: comparación de promedios
+    periodos = []
+    promedios = []
+    colores = []
+
+    if promedio_15d is not None:
+        periodos.append('15 días')
+        promedios.append(promedio_15d)
+        colores.append('#ff7f0e')
+
+    if promedio_30d is not None:
+        periodos.append('30 días')
+        promedios.append(promedio_30d)
+        colores.append('#2ca02c')
+
+    if promedio_90d is not None:
+        periodos.append('90 días')
+        promedios.append(promedio_90d)
+        colores.append('#d62728')
+
+    if periodos:
+        fig.add_trace(
+            go.Bar(
+                x=periodos,
+                y=promedios,
+                name='Promedio por Período',
+                marker_color=colores,
+                marker_line_width=0,
+                # texttemplate + posición fija: plotly.js no recalcula el
+                # layout del texto por barra como con textposition='auto'
+                text=tuple(f'{p:.1f}%' for p in promedios),
+                texttemplate='%{text}',
+                textposition='outside',
+                cliponaxis=False,
+                hovertemplate='<b>%{x}</b><br>Promedio: %{y:.1f}%<extra></extra>'
+            ),
+            row=2, col=1
+        )
+
+    # Gráfica de volumen de llamadas: con el resampler el volumen viaja
+    # como área re-muestreada (las barras no se re-muestrean bien); sin él
+    # se mantiene la barra, con respaldo LTTB para fuentes muy densas
+    x_vol = df_30d['fecha'] if len(df_30d) > 0 else pd.Series(dtype='datetime64[ns]')
+    y_vol = df_30d['total_llamadas'] if len(df_30d) > 0 else pd.Series(dtype='int64')
+    if PLOTLY_RESAMPLER_DISPONIBLE and len(df_30d) > 0:
+        fig.add_trace(
+            go.Scattergl(
+                mode='lines',
+                fill='tozeroy',
+                name='Llamadas Diarias',
+                line=dict(color='lightblue', width=1),
+                opacity=0.7,
+                hovertemplate='<b>%{x}</b><br>Llamadas: %{y}<extra></extra>'
+            ),
+            hf_x=x_vol, hf_y=y_vol,
+            row=2, col=2
+        )
+    else:
+        if len(df_30d) > 2000:
+            idx = _submuestrear_lttb(x_vol.to_numpy(), y_vol.to_numpy())
+            x_vol = x_vol.iloc[idx]
+            y_vol = y_vol.iloc[idx]
+        fig.add_trace(
+            go.Bar(
+                x=x_vol,
+                y=y_vol,
+                name='Llamadas Diarias',
+                marker_color='lightblue',
+                marker_line_width=0,
+                opacity=0.7,
+                hovertemplate='<b>%{x}</b><br>Llamadas: %{y}<extra></extra>'
+            ),
+            row=2, col=2
+        )
+
+    # Solo el título es dinámico; layout y ejes ya vienen del esqueleto.
+    # uirevision estable por tipo: el navegador conserva zoom/buffers y
+    # solo difiere los datos en vez de re-renderizar todo en cada rerun
+    fig.update_layout(title=f"Análisis de Atención - Llamadas {tipo_llamada}",
+                      uirevision=f'atencion_{tipo_llamada}')
+
+    return fig
+
+
+@st.cache_data(ttl=3600, show_spinner=False,
+               hash_funcs={pd.DataFrame: _hash_df_diario})
+def _tabla_resumen_semanal_html(df_30d):
+    """HTML del resumen por día de la semana; generado una vez por serie.
+
+    El string completo (gradiente incluido) se cachea con el mismo hash
+    barato de la figura, así los reruns solo pagan un st.markdown.
+    """
+    # Sumas por día vía np.bincount sobre los códigos de día: para 7
+    # grupos y 5 agregaciones evita el dispatch multi-agg del groupby;
+    # media y desviación salen de sumas y cuadrados
+    orden_dias = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    dow = df_30d['fecha'].dt.dayofweek.to_numpy()
+    pct = df_30d['porcentaje_atencion'].to_numpy(dtype=float)
+    tot = df_30d['total_llamadas'].to_numpy(dtype=float)
+    aten = df_30d['llamadas_atendidas'].to_numpy(dtype=float)
+
+    counts = np.bincount(dow, minlength=7)
+    sum_pct = np.bincount(dow, weights=pct, minlength=7)
+    sq_pct = np.bincount(dow, weights=pct * pct, minlength=7)
+    sum_tot = np.bincount(dow, weights=tot, minlength=7)
+    sum_aten = np.bincount(dow, weights=aten, minlength=7)
+
+    presentes = counts > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_pct = np.where(presentes, sum_pct / counts, np.nan)
+        # ddof=1 para igualar el std del groupby de pandas
+        var_pct = np.where(counts > 1,
+                           (sq_pct - counts * media_pct ** 2) / (counts - 1),
+                           np.nan)
+        std_pct = np.sqrt(np.maximum(var_pct, 0))
+        media_tot = np.where(presentes, sum_tot / counts, np.nan)
+
+    resumen_semanal = pd.DataFrame({
+        'Atención Promedio (%)': media_pct,
+        'Desv. Estándar (%)': std_pct,
+        'Llamadas Promedio/Día': media_tot,
+        'Total Llamadas': sum_tot,
+        'Total Atendidas': sum_aten
+    }, index=orden_dias).loc[presentes].round(2)
+
+    # Tabla HTML con gradiente precalculado: evita el Styler de
+    # pandas (Jinja2, string HTML celda por celda) en cada rerun
+    from matplotlib import colormaps
+
+    vals = resumen_semanal['Atención Promedio (%)'].to_numpy(dtype=float)
+    norm = (vals - vals.min()) / (vals.max() - vals.min() + 1e-9)
+    rgb = (colormaps['RdYlGn'](norm)[:, :3] * 255).astype(np.uint8)
+
+    filas_html = []
+    for (dia, fila), color in zip(resumen_semanal.iterrows(), rgb):
+        fondo = f"background-color: rgb({color[0]},{color[1]},{color[2]})"
+        filas_html.append(
+            f"<tr><td><b>{dia}</b></td>"
+            f"<td style='{fondo}'>{fila['Atención Promedio (%)']:.1f}%</td>"
+            f"<td>{fila['Desv. Estándar (%)']:.1f}%</td>"
+            f"<td>{fila['Llamadas Promedio/Día']:.0f}</td>"
+            f"<td>{fila['Total Llamadas']:,.0f}</td>"
+            f"<td>{fila['Total Atendidas']:,.0f}</td></tr>"
+        )
+    return (
+        "<table style='width:100%; border-collapse:collapse; text-align:right'>"
+        "<thead><tr><th>Día</th><th>Atención Promedio (%)</th>"
+        "<th>Desv. Estándar (%)</th><th>Llamadas Promedio/Día</th>"
+        "<th>Total Llamadas</th><th>Total Atendidas</th></tr></thead>"
+        f"<tbody>{''.join(filas_html)}</tbody></table>"
+    )
+
+
+# Color, emoji y contenedor por severidad de alerta; constante de módulo
+# para no reconstruir el dict (y sus referencias) en cada render
+# Tarjeta de objetivo como plantilla HTML: las 4 métricas se renderizan en
+# un solo st.markdown (1 mensaje al frontend en vez de 12 componentes) y la
+# barra de progreso es un linear-gradient CSS, sin st.progress
+_PLANTILLA_TARJETA_OBJETIVO = (
+    '<div style="flex:1;background-color:#f8f9fa;border:1px solid #e9ecef;'
+    'padding:1rem;border-radius:8px;box-shadow:0 1px 3px rgba(0,0,0,0.1)">'
+    '<div style="font-size:0.85rem;color:#555">{emoji} {metrica}</div>'
+    '<div style="font-size:1.6rem;font-weight:600">{actual:.1f} {unidad}</div>'
+    '<div style="font-size:0.8rem;color:#888">Objetivo: {objetivo} {unidad}</div>'
+    '<div style="height:8px;border-radius:4px;margin-top:0.5rem;'
+    'background:linear-gradient(to right,#ff4b4b {progreso:.0f}%,#e9ecef {progreso:.0f}%)"></div>'
+    '<div style="font-size:0.75rem;color:#888;margin-top:0.25rem">'
+    '{estado} ({progreso:.0f}%)</div>'
+    '</div>'
+)
+
+# Orden canónico Lunes→Domingo como pd.Index: intersection() resuelve la
+# pertenencia en C manteniendo este orden, sin filtro por comprensión
+_ORDEN_DIAS = pd.Index(['Lunes', 'Martes', 'Miércoles', 'Jueves',
+                        'Viernes', 'Sábado', 'Domingo'])
+
+_CONFIG_SEVERIDAD = {
+    'CRITICA': {'color': 'red', 'emoji': '🔴', 'container': st.error},
+    'ALTA': {'color': 'orange', 'emoji': '🟠', 'container': st.warning},
+    'MEDIA': {'color': 'yellow', 'emoji': '🟡', 'container': st.info},
+    'BAJA': {'color': 'blue', 'emoji': '🔵', 'container': st.info}
+}
+
+# Colores por columna de modelo; a nivel de módulo para no reconstruir el
+# dict por render y para iterar solo las columnas candidatas
+MODEL_COLORS = {
+    'yhat_arima': '#FF6B6B',
+    'yhat_prophet': '#4ECDC4',
+    'yhat_random_forest': '#45B7D1',
+    'yhat_gradient_boosting': '#96CEB4',
+    'yhat_ridge': '#FECA57',
+    'yhat_ensemble': '#6C5CE7'
+}
+
+
+def _hash_df_predicciones(d):
+    """Hash para frames de predicciones/histórico: forma + última fecha +
+    bytes de la columna de valores.
+
+    Forma y fecha solas no bastan: los frames ENTRANTE y SALIENTE salen de
+    la misma corrida multi-modelo con igual horizonte y columnas, así que
+    colisionarían entre tipos y se serviría la figura del otro tipo.
+    """
+    if len(d) == 0:
+        return 0
+    col = 'yhat_ensemble' if 'yhat_ensemble' in d.columns else d.columns[-1]
+    return (d.shape, str(d['ds'].iloc[-1]), d[col].to_numpy().tobytes())
+
+
+@st.cache_data(ttl=3600, show_spinner=False,
+               hash_funcs={pd.DataFrame: _hash_df_predicciones})
+def _construir_figura_predicciones(df_predicciones, df_historico):
+    """Construye la figura detallada de predicciones; cacheada entre reruns.
+
+    Reconstruir y re-serializar las 7+ trazas en cada rerun domina el costo
+    de esta vista; con el hash forma + última fecha, interacciones que no
+    cambian las predicciones reutilizan el JSON de Plotly ya armado.
+    """
+    fig = copy.deepcopy(_esqueleto_figura_predicciones())
+
+    # Trazas largas en WebGL: SVG crea un nodo DOM por segmento, Scattergl
+    # dibuja por lotes en GPU. El overlay ensemble (lines+markers) queda en
+    # Scatter para conservar el estilo exacto de los marcadores.
+    Traza = go.Scattergl if len(df_predicciones) > 1000 else go.Scatter
+
+    # ds como local y arrays numpy para Plotly: evita el dispatch
+    # __getitem__ por add_trace y el wrapping de Series
+    ds = df_predicciones['ds']
+
+    # Agregar datos históricos si están disponibles
+    if df_historico is not None:
+        # Filtrar históricos para que no se solapen con predicciones
+        fecha_limite = ds.min() - timedelta(days=1)
+        df_hist_filtrado = df_historico[df_historico['ds'] <= fecha_limite]
+
+        # Históricos largos: submuestreo LTTB antes de serializar a Plotly
+        if len(df_hist_filtrado) > 2000:
+            idx = _submuestrear_lttb(df_hist_filtrado['ds'].to_numpy(),
+                                     df_hist_filtrado['y'].to_numpy())
+            df_hist_filtrado = df_hist_filtrado.iloc[idx]
+
+        TrazaHist = go.Scattergl if len(df_hist_filtrado) > 1000 else go.Scatter
+        fig.add_trace(
+            TrazaHist(
+                x=df_hist_filtrado['ds'],
+                y=df_hist_filtrado['y'],
+                mode='lines',
+                name='Histórico Real',
+                line=dict(color='black', width=2),
+                opacity=0.7
+            ),
+            row=1, col=1
+        )
+
+        # Agregar línea vertical separadora
+        fig.add_vline(
+            x=fecha_limite,
+            line_dash="dash",
+            line_color="red",
+            annotation_text="Inicio Predicciones",
+            annotation_position="top"
+        )
+
+    # Agregar predicciones: los modelos individuales van en una sola traza
+    # Scattergl con separadores None (una traza por modelo multiplica el
+    # costo de leyenda/hover/draw-calls en el navegador)
+    xs, ys, etiquetas = [], [], []
+    fechas = list(ds)
+
+    for col in MODEL_COLORS:
+        if col not in df_predicciones.columns:
+            continue
+        modelo_name = col.replace('yhat_', '').replace('_', ' ').title()
+
+        # Estilo especial para ensemble
+        if 'ensemble' in col:
+            fig.add_trace(
+                go.Scatter(
+                    x=ds,
+                    y=df_predicciones[col].to_numpy(),
+                    mode='lines+markers',
+                    name=f'{modelo_name} (Principal)',
+                    line=dict(color=MODEL_COLORS[col], width=4),
+                    marker=dict(size=6)
+                ),
+                row=1, col=1
+            )
+        else:
+            xs.extend(fechas)
+            xs.append(None)
+            ys.extend(df_predicciones[col].to_numpy())
+            ys.append(None)
+            etiquetas.extend([modelo_name] * (len(fechas) + 1))
+
+    if xs:
+        fig.add_trace(
+            go.Scattergl(
+                x=xs,
+                y=ys,
+                mode='lines',
+                name='Modelos individuales',
+                line=dict(width=1.5, dash='dot'),
+                opacity=0.6,
+                customdata=etiquetas,
+                hovertemplate='%{customdata}<br>%{x}: %{y:.1f}<extra></extra>'
+            ),
+            row=1, col=1
+        )
+
+    # Agregar intervalos de confianza en el segundo subplot
+    if 'yhat_upper' in df_predicciones.columns and 'yhat_lower' in df_predicciones.columns:
+        fig.add_trace(
+            Traza(
+                x=ds,
+                y=df_predicciones['yhat_upper'].to_numpy(),
+                mode='lines',
+                name='Límite Superior',
+                line=dict(color='rgba(108, 92, 231, 0.3)', width=1),
+                showlegend=False
+            ),
+            row=2, col=1
+        )
+
+        fig.add_trace(
+            Traza(
+                x=ds,
+                y=df_predicciones['yhat_lower'].to_numpy(),
+                mode='lines',
+                name='Límite Inferior',
+                line=dict(color='rgba(108, 92, 231, 0.3)', width=1),
+                fill='tonexty',
+                fillcolor='rgba(108, 92, 231, 0.1)',
+                showlegend=False
+            ),
+            row=2, col=1
+        )
+
+        fig.add_trace(
+            Traza(
+                x=ds,
+                y=df_predicciones['yhat_ensemble'].to_numpy(),
+                mode='lines',
+                name='Predicción Ensemble',
+                line=dict(color='#6C5CE7', width=3)
+            ),
+            row=2, col=1
+        )
+
+    # Configurar layout
+    fig.update_layout(
+        height=800,
+        title="Comparación Detallada de Modelos de Predicción",
+        hovermode='x unified'
+    )
+
+    fig.update_xaxes(title_text="Fecha", row=2, col=1)
+    fig.update_yaxes(title_text="Número de Llamadas", row=1, col=1)
+    fig.update_yaxes(title_text="Llamadas (con Incertidumbre)", row=2, col=1)
+
+    return fig
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cargar_csv_llamadas(ruta_archivo, mtime):
+    """Lee y parsea el CSV crudo de llamadas; cacheado por (ruta, mtime).
+
+    El mtime en la clave invalida el cache en cuanto el archivo cambia,
+    así la lectura + parseo de fechas no dependen del TTL corto del
+    método de alto nivel ni se repiten en cada miss de éste.
+    """
+    if isinstance(ruta_archivo, str):
+        encoding = _detectar_encoding(ruta_archivo)
+        df = _leer_csv_llamadas(ruta_archivo, encoding)
+    else:
+        # Subidas file-like: no hay ruta que abrir para olfatear el
+        # encoding; utf-8 primero y reintento latin-1 rebobinando, igual
+        # que _generar_datos_desde_archivo_real
+        try:
+            df = _leer_csv_llamadas(ruta_archivo, 'utf-8')
+        except UnicodeDecodeError:
+            if hasattr(ruta_archivo, 'seek'):
+                ruta_archivo.seek(0)
+            df = _leer_csv_llamadas(ruta_archivo, 'latin-1')
+
+    # Procesar fechas
+    try:
+        df['FECHA'] = pd.to_datetime(df['FECHA'], format='%d-%m-%Y %H:%M:%S',
+                                     errors='coerce')
+    except (ValueError, TypeError):
+        # Fallback para otros formatos
+        df['FECHA'] = pd.to_datetime(df['FECHA'], dayfirst=True, errors='coerce')
+    df = df.dropna(subset=['FECHA'])
+
+    # Columnas de baja cardinalidad como category (el lector PyArrow ya
+    # las entrega dictionary-encoded; esto cubre el fallback de pandas)
+    for col in ('SENTIDO', 'ATENDIDA'):
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _hash_df_llamadas(d):
+    """Hash barato para frames de llamadas: longitud + primera/última FECHA.
+
+    Evita que st.cache_data serialice el frame completo solo para decidir
+    si hubo cache hit.
+    """
+    if len(d) == 0 or 'FECHA' not in d.columns:
+        return len(d)
+    return (len(d), str(d['FECHA'].iloc[0]), str(d['FECHA'].iloc[-1]))
+
+
+@st.cache_data(ttl=3600, show_spinner=False,
+               hash_funcs={pd.DataFrame: _hash_df_llamadas})
+def _agregados_atencion_diaria(df_filtrado, tipo_llamada):
+    """Serie diaria de atención (conteos, atendidas, % y hora promedio).
+
+    El groupby diario sobre el frame por llamada era el costo pandas
+    dominante de la vista de atención en cada rerun; cacheado por
+    (hash del frame, tipo), un cambio de widget lo reutiliza. tipo_llamada
+    entra en la clave porque los frames in/out comparten rango de fechas.
+    """
+    atendida_bool = ((df_filtrado['ATENDIDA'] == 'Si')
+                     if 'ATENDIDA' in df_filtrado.columns
+                     else pd.Series(False, index=df_filtrado.index))
+
+    # Agregar datos por día (clave datetime64[D]; sort necesario porque
+    # la serie alimenta la línea de tiempo ordenada)
+    df_diario = (df_filtrado.assign(atendida_bool=atendida_bool)
+                 .groupby('fecha_solo', observed=True)
+                 .agg({
+                     'TELEFONO': 'size',      # Total de llamadas ('size' no chequea NaN)
+                     'atendida_bool': 'sum',  # Llamadas atendidas
+                     'hora': 'mean'           # Hora promedio (para referencia)
+                 }).reset_index())
+
+    df_diario.columns = ['fecha', 'total_llamadas', 'llamadas_atendidas', 'hora_promedio']
+    df_diario['fecha'] = pd.to_datetime(df_diario['fecha'])
+
+    # Calcular porcentaje de atención
+    df_diario['porcentaje_atencion'] = (df_diario['llamadas_atendidas'] / df_diario['total_llamadas'] * 100).fillna(0)
+
+    # Tipos angostos: conteos diarios caben en uint16 y los porcentajes
+    # en float32; mitad de ancho de banda para las medias posteriores y
+    # la serialización JSON de Plotly
+    if df_diario['total_llamadas'].max() < np.iinfo(np.uint16).max:
+        df_diario = df_diario.astype({
+            'total_llamadas': 'uint16',
+            'llamadas_atendidas': 'uint16'
+        })
+    df_diario = df_diario.astype({
+        'porcentaje_atencion': 'float32',
+        'hora_promedio': 'float32'
+    })
+    return df_diario
+
+
+@st.cache_data(persist='disk', ttl=86400, show_spinner=False,
+               hash_funcs={pd.DataFrame: _hash_df_llamadas})
+def _calcular_cubo_temporal(df_filtrado):
+    """Cubo counts[semana, día, hora] en una sola pasada sobre la tabla.
+
+    Las vistas semanal (suma sobre horas) y combinada (suma sobre semanas)
+    se derivan del mismo tensor, así los heatmaps comparten un único scan
+    de df_filtrado en vez de reagregarlo por separado. El cubo agregado
+    pesa ≤53x7x24 enteros, así que se persiste a disco: los reruns y los
+    reinicios de la app trabajan sobre buckets, no sobre el frame por llamada.
+    """
+    semanas = df_filtrado['semana'].to_numpy()
+    semanas_unicas, fila = np.unique(semanas, return_inverse=True)
+    cubo = _contar_cubo(fila, df_filtrado['dia_semana_num'].to_numpy(),
+                        df_filtrado['hora'].to_numpy(), len(semanas_unicas))
+    return cubo, semanas_unicas
+
+
+@st.cache_data(persist='disk', ttl=86400, show_spinner=False,
+               hash_funcs={pd.DataFrame: _hash_df_llamadas})
+def _contar_fecha_hora(df_filtrado):
+    """Histograma fecha x hora pre-agregado y persistido (≤365x24 buckets)"""
+    fechas = df_filtrado['fecha_solo'].to_numpy()
+    fechas_unicas, fila = np.unique(fechas, return_inverse=True)
+    mat = np.zeros((len(fechas_unicas), 24), dtype=np.int32)
+    np.add.at(mat, (fila, df_filtrado['hora'].to_numpy()), 1)
+    return mat, fechas_unicas
+
+
+@st.cache_data(ttl=3600, show_spinner=False,
+               hash_funcs={pd.DataFrame: _hash_df_llamadas})
+def _preparar_datos_heatmap_cached(df_completo, tipo_llamada):
+    """Prepara los datos para los heatmaps; cacheado entre reruns.
+
+    Cualquier interacción con un widget re-ejecuta el script completo:
+    sin cache, el parseo de fechas y las columnas derivadas se recomputan
+    en cada rerun aunque los datos no cambiaron.
+    """
+    # Validación temprana del esquema: con esto los cuerpos de los heatmaps
+    # quedan libres de try/except (el único manejador vive en el dispatcher)
+    if 'FECHA' not in df_completo.columns:
+        st.error("Error preparando datos: falta la columna FECHA")
+        return pd.DataFrame()
+
+    # Filtrar por tipo de llamada si no son datos de ejemplo, copiando
+    # solo FECHA: las vistas únicamente consumen columnas derivadas de
+    # la fecha, así la copia no arrastra el resto de la tabla
+    if 'SENTIDO' in df_completo.columns:
+        sentido_filter = 'in' if tipo_llamada.upper() == 'ENTRANTE' else 'out'
+        mascara = (df_completo['SENTIDO'] == sentido_filter).to_numpy()
+        df_filtrado = df_completo.loc[mascara, ['FECHA']].copy()
+    else:
+        # Para datos de ejemplo que no tienen SENTIDO
+        df_filtrado = df_completo[['FECHA']].copy()
+
+    # Convertir fechas con formato fijo: usa el parser C vectorizado
+    # en lugar de la inferencia dateutil fila a fila
+    try:
+        df_filtrado['FECHA'] = pd.to_datetime(
+            df_filtrado['FECHA'], format='%d-%m-%Y %H:%M:%S', cache=True
+        )
+    except (ValueError, TypeError):
+        # Formato inesperado: volver a la inferencia tolerante
+        df_filtrado['FECHA'] = pd.to_datetime(df_filtrado['FECHA'], errors='coerce')
+
+    # Filtrar datos válidos
+    df_filtrado = df_filtrado.dropna(subset=['FECHA'])
+    if df_filtrado.empty:
+        return df_filtrado
+
+    # Extraer todos los campos temporales desde un único DatetimeIndex:
+    # una pasada sobre el buffer int64 en vez de seis accessors .dt
+    # independientes. Solo las columnas que los heatmaps consumen.
+    idx = pd.DatetimeIndex(df_filtrado['FECHA'])
+    df_filtrado['dia_semana_num'] = idx.dayofweek.astype('int8')
+    df_filtrado['hora'] = idx.hour.astype('int8')
+    df_filtrado['fecha_solo'] = idx.normalize()
+    # to_numpy(): isocalendar() viene indexado por las fechas y asignarlo
+    # directo alinearía por índice contra las etiquetas del frame (NaN)
+    df_filtrado['semana'] = idx.isocalendar().week.to_numpy().astype('int16')
+
+    return df_filtrado
+
+
 # Configuración de la página
 st.set_page_config(
     page_title="CEAPSI - Validación de Modelos de Llamadas",
@@ -44,11 +1007,9 @@ class DashboardValidacionCEAPSI:
         # Usar directorio actual del script
         base_path = Path(__file__).parent.absolute()
         try:
-            # Buscar carpetas de resultados en el directorio actual
-            carpetas = [d for d in os.listdir(base_path) if d.startswith('resultados_')]
-            if carpetas:
-                return os.path.join(base_path, max(carpetas))
-            return str(base_path)
+            # Memoizado por mtime del directorio: se re-escanea solo si cambió
+            return _carpeta_resultados_reciente(str(base_path),
+                                                os.path.getmtime(base_path))
         except:
             return base_path
     
@@ -57,21 +1018,29 @@ class DashboardValidacionCEAPSI:
         """Carga resultados del sistema multi-modelo"""
         try:
             # Buscar archivo más reciente en el directorio actual
-            archivos = [f for f in os.listdir('.') 
-                       if f.startswith(f'predicciones_multimodelo_{tipo_llamada.lower()}') and f.endswith('.json')]
-            
+            prefijo = f'predicciones_multimodelo_{tipo_llamada.lower()}'
+            with os.scandir('.') as entradas:
+                archivos = [e.name for e in entradas
+                            if e.name.startswith(prefijo) and e.name.endswith('.json')]
+
             if not archivos:
                 st.info(f"📁 No se encontraron resultados para {tipo_llamada}. Creando predicciones de ejemplo...")
                 return _self._crear_resultados_ejemplo(tipo_llamada)
+
+            # max() basta: los nombres llevan timestamp ISO, y así se evita
+            # ordenar la lista completa solo para quedarse con el último
+            archivo_reciente = max(archivos)
             
-            archivo_reciente = sorted(archivos)[-1]
-            
-            with open(archivo_reciente, 'r', encoding='utf-8') as f:
-                resultados = json.load(f)
-            
-            # Convertir predicciones a DataFrame
-            df_pred = pd.DataFrame(resultados['predicciones'])
-            df_pred['ds'] = pd.to_datetime(df_pred['ds'])
+            resultados = _cargar_json(archivo_reciente)
+
+            # Convertir predicciones a DataFrame; pasar columns= explícito
+            # evita que pandas escanee todos los dicts buscando la unión de claves
+            predicciones = resultados['predicciones']
+            columnas = list(predicciones[0].keys()) if predicciones else None
+            df_pred = pd.DataFrame.from_records(predicciones, columns=columnas)
+            # cache=True dedupe los timestamps repetidos al parsear
+            df_pred['ds'] = pd.to_datetime(df_pred['ds'], format='ISO8601',
+                                           cache=True)
             
             return resultados, df_pred
             
@@ -85,7 +1054,19 @@ class DashboardValidacionCEAPSI:
         try:
             # Usar ruta simple, sin base_path que puede estar mal configurado
             archivo_historico = f"datos_prophet_{tipo_llamada.lower()}.csv"
-            
+            archivo_parquet = f"datos_prophet_{tipo_llamada.lower()}.parquet"
+
+            # Preferir Parquet si existe y no quedó desactualizado
+            # respecto del CSV: tipado y sin re-parseo de fechas
+            if os.path.exists(archivo_parquet):
+                try:
+                    vigente = (not os.path.exists(archivo_historico) or
+                               os.path.getmtime(archivo_parquet) >= os.path.getmtime(archivo_historico))
+                except OSError:
+                    vigente = False
+                if vigente:
+                    return pd.read_parquet(archivo_parquet)
+
             # Verificar si existe el archivo o si hay datos manuales
             if not os.path.exists(archivo_historico):
                 if _self.archivo_datos_manual:
@@ -95,8 +1076,34 @@ class DashboardValidacionCEAPSI:
                     st.info(f"📁 Creando datos de ejemplo para {tipo_llamada}...")
                     return _self._crear_datos_ejemplo_historicos(tipo_llamada)
             
-            df_hist = pd.read_csv(archivo_historico)
-            df_hist['ds'] = pd.to_datetime(df_hist['ds'])
+            if POLARS_DISPONIBLE:
+                # scan_csv arma un plan perezoso que collect() ejecuta en
+                # una sola pasada multi-hilo (parseo de fechas incluido);
+                # el select empuja la proyección al lector y solo el
+                # resultado chico cruza a pandas
+                df_hist = (pl.scan_csv(archivo_historico, try_parse_dates=True)
+                           .select(['ds', 'y'])
+                           .collect()
+                           .to_pandas())
+                df_hist['ds'] = pd.to_datetime(df_hist['ds'])
+            elif PYARROW_DISPONIBLE:
+                # El motor pyarrow parsea 'ds' dentro del tokenizador C
+                # multihilo, sin una pasada extra de to_datetime
+                df_hist = pd.read_csv(archivo_historico, engine='pyarrow',
+                                      usecols=['ds', 'y'], parse_dates=['ds'])
+            else:
+                df_hist = pd.read_csv(archivo_historico, usecols=['ds', 'y'])
+                df_hist['ds'] = pd.to_datetime(df_hist['ds'])
+            # float32 basta para conteos diarios y reduce a la mitad lo
+            # que mueven las métricas y la serialización de Plotly
+            df_hist['y'] = df_hist['y'].astype('float32')
+            # Dejar la versión columnar junto al CSV: las próximas cargas
+            # saltan el parseo completo y leen el Parquet tipado
+            if PYARROW_DISPONIBLE:
+                try:
+                    df_hist.to_parquet(archivo_parquet, compression='snappy', index=False)
+                except (OSError, ValueError):
+                    pass
             return df_hist
         except Exception as e:
             st.warning(f"No se pudieron cargar datos históricos: {e}")
@@ -120,37 +1127,60 @@ class DashboardValidacionCEAPSI:
                 st.warning("📁 No hay archivo de datos cargado. Usando datos de ejemplo limitados...")
                 st.info("💡 Sube un archivo de datos para análisis completo con tu información real.")
                 return _self._crear_datos_ejemplo_completos()
-            
-            # Intentar diferentes encodings
-            for encoding in ['utf-8', 'latin-1', 'cp1252']:
+
+            # Cache columnar en disco junto al CSV: los arranques en frío
+            # leen el Parquet ya tipado (fechas y derivadas incluidas) en vez
+            # de repetir el parseo completo del CSV
+            ruta_cache = None
+            if PYARROW_DISPONIBLE and isinstance(archivo_llamadas, str):
+                ruta_cache = f"{archivo_llamadas}.parquet"
                 try:
-                    df_completo = pd.read_csv(archivo_llamadas, sep=';', encoding=encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                st.error("No se pudo cargar el archivo con ningún encoding")
-                return None
-            
-            # Procesar fechas
+                    if (os.path.exists(ruta_cache) and
+                            os.path.getmtime(ruta_cache) >= os.path.getmtime(archivo_llamadas)):
+                        return pd.read_parquet(ruta_cache)
+                except (OSError, ValueError):
+                    pass
+
+            # Lectura cruda cacheada por (ruta, mtime): la derivación de
+            # columnas queda separada del I/O + parseo
             try:
-                df_completo['FECHA'] = pd.to_datetime(df_completo['FECHA'], format='%d-%m-%Y %H:%M:%S', errors='coerce')
-            except:
-                # Fallback para otros formatos
-                df_completo['FECHA'] = pd.to_datetime(df_completo['FECHA'], dayfirst=True, errors='coerce')
-            
-            df_completo = df_completo.dropna(subset=['FECHA'])
-            
-            # Agregar columnas derivadas
-            df_completo['fecha_solo'] = df_completo['FECHA'].dt.date
-            df_completo['hora'] = df_completo['FECHA'].dt.hour
-            df_completo['dia_semana'] = df_completo['FECHA'].dt.day_name()
-            df_completo['mes'] = df_completo['FECHA'].dt.month
-            df_completo['ano'] = df_completo['FECHA'].dt.year
-            
-            # Filtrar solo días laborales
-            df_completo = df_completo[df_completo['FECHA'].dt.dayofweek < 5]
-            
+                mtime = (os.path.getmtime(archivo_llamadas)
+                         if isinstance(archivo_llamadas, str) else 0)
+                df_completo = _cargar_csv_llamadas(archivo_llamadas, mtime)
+            except (UnicodeDecodeError, OSError) as e:
+                st.error(f"No se pudo cargar el archivo: {e}")
+                return None
+
+
+            # Filtrar solo días laborales ANTES de derivar columnas: ~28%
+            # menos filas para todo el trabajo posterior (época 1970-01-01
+            # fue jueves = 3)
+            vals = df_completo['FECHA'].values
+            dias = vals.astype('datetime64[D]')
+            laboral = ((dias.astype('int64') + 3) % 7) < 5
+            df_completo = df_completo[laboral]
+            vals = vals[laboral]
+            dias = dias[laboral]
+
+            # Agregar columnas derivadas con aritmética entera sobre el
+            # buffer datetime64: una conversión base y restas de enteros en
+            # vez de un pase .dt por columna. datetime64[D] como clave de
+            # groupby se hashea como int64 en C, no como PyObject por fila.
+            meses = vals.astype('datetime64[M]')
+            anos = vals.astype('datetime64[Y]')
+            df_completo['fecha_solo'] = dias
+            df_completo['hora'] = (vals.astype('datetime64[h]') - dias).astype('int8')
+            df_completo['mes'] = (meses - anos).astype('int8') + 1
+            df_completo['ano'] = anos.astype('int64').astype('int16') + 1970
+
+            if ruta_cache:
+                try:
+                    df_completo.to_parquet(ruta_cache, compression='zstd', index=False)
+                except Exception:
+                    # El cache es solo una optimización; sin permisos de
+                    # escritura o sin zstd seguimos con el DataFrame en RAM
+                    pass
+
             return df_completo
             
         except Exception as e:
@@ -188,40 +1218,53 @@ class DashboardValidacionCEAPSI:
         metadatos_modelos = resultados.get('metadatos_modelos', {})
         pesos_ensemble = resultados.get('pesos_ensemble', {})
         
-        # Preparar datos para visualización
-        metricas_data = []
-        
-        for modelo, metadata in metadatos_modelos.items():
-            mae = metadata.get('mae_validacion', metadata.get('mae_cv', 0))
-            rmse = metadata.get('rmse_validacion', metadata.get('rmse_cv', 0))
-            peso = pesos_ensemble.get(modelo, 0)
-            
-            metricas_data.append({
-                'Modelo': modelo.replace('_', ' ').title(),
+        # Columnas paralelas en vez de lista de dicts: evita un dict por
+        # modelo y el pase de inferencia de tipos de pandas sobre filas
+        n_modelos = len(metadatos_modelos)
+        mae = np.fromiter(
+            (m.get('mae_validacion', m.get('mae_cv', 0))
+             for m in metadatos_modelos.values()),
+            dtype='f8', count=n_modelos)
+        rmse = np.fromiter(
+            (m.get('rmse_validacion', m.get('rmse_cv', 0))
+             for m in metadatos_modelos.values()),
+            dtype='f8', count=n_modelos)
+        peso = np.fromiter(
+            (pesos_ensemble.get(modelo, 0) for modelo in metadatos_modelos),
+            dtype='f8', count=n_modelos)
+
+        if n_modelos:
+            df_metricas = pd.DataFrame({
+                'Modelo': [m.replace('_', ' ').title() for m in metadatos_modelos],
                 'MAE': mae,
                 'RMSE': rmse,
                 'Peso Ensemble': peso,
-                'Status': '✅ Activo' if peso > 0 else '❌ Inactivo'
+                'Status': np.where(peso > 0, '✅ Activo', '❌ Inactivo')
             })
-        
-        if metricas_data:
-            df_metricas = pd.DataFrame(metricas_data)
             
             # Mostrar tabla de métricas
             col1, col2 = st.columns([2, 1])
             
             with col1:
+                # column_config formatea en el grid del cliente: sin Styler,
+                # sin HTML por celda ni lookup de colormap en cada rerun
                 st.dataframe(
-                    df_metricas.style.format({
-                        'MAE': '{:.2f}',
-                        'RMSE': '{:.2f}',
-                        'Peso Ensemble': '{:.3f}'
-                    }).background_gradient(subset=['MAE', 'RMSE'], cmap='RdYlGn_r'),
-                    use_container_width=True
+                    df_metricas,
+                    column_config={
+                        'MAE': st.column_config.NumberColumn(format='%.2f'),
+                        'RMSE': st.column_config.NumberColumn(format='%.2f'),
+                        'Peso Ensemble': st.column_config.ProgressColumn(
+                            format='%.3f', min_value=0.0, max_value=1.0
+                        )
+                    },
+                    use_container_width=True,
+                    hide_index=True
                 )
             
             with col2:
-                # Gráfico de pesos
+                # Gráfico de pesos (import diferido de px, ver arriba)
+                import plotly.express as px
+
                 fig_pesos = px.pie(
                     df_metricas[df_metricas['Peso Ensemble'] > 0],
                     values='Peso Ensemble',
@@ -231,7 +1274,7 @@ class DashboardValidacionCEAPSI:
                 st.plotly_chart(fig_pesos, use_container_width=True)
         
         # Mostrar mejores y peores modelos
-        if metricas_data:
+        if n_modelos:
             col1, col2, col3 = st.columns(3)
             
             df_activos = df_metricas[df_metricas['Peso Ensemble'] > 0]
@@ -265,133 +1308,11 @@ class DashboardValidacionCEAPSI:
     def mostrar_grafico_predicciones_detallado(self, df_predicciones, df_historico=None):
         """Muestra gráfico detallado de predicciones con comparación de modelos"""
         st.subheader("📈 Predicciones Detalladas por Modelo")
-        
-        # Crear figura con subplots
-        fig = make_subplots(
-            rows=2, cols=1,
-            subplot_titles=("Comparación de Predicciones", "Intervalos de Confianza"),
-            vertical_spacing=0.1,
-            row_heights=[0.7, 0.3]
-        )
-        
-        # Colores para cada modelo
-        colores = {
-            'yhat_arima': '#FF6B6B',
-            'yhat_prophet': '#4ECDC4',
-            'yhat_random_forest': '#45B7D1',
-            'yhat_gradient_boosting': '#96CEB4',
-            'yhat_ridge': '#FECA57',
-            'yhat_ensemble': '#6C5CE7'
-        }
-        
-        # Agregar datos históricos si están disponibles
-        if df_historico is not None:
-            # Filtrar históricos para que no se solapen con predicciones
-            fecha_limite = df_predicciones['ds'].min() - timedelta(days=1)
-            df_hist_filtrado = df_historico[df_historico['ds'] <= fecha_limite]
-            
-            fig.add_trace(
-                go.Scatter(
-                    x=df_hist_filtrado['ds'],
-                    y=df_hist_filtrado['y'],
-                    mode='lines',
-                    name='Histórico Real',
-                    line=dict(color='black', width=2),
-                    opacity=0.7
-                ),
-                row=1, col=1
-            )
-            
-            # Agregar línea vertical separadora
-            fig.add_vline(
-                x=fecha_limite,
-                line_dash="dash",
-                line_color="red",
-                annotation_text="Inicio Predicciones",
-                annotation_position="top"
-            )
-        
-        # Agregar predicciones de cada modelo
-        for col in df_predicciones.columns:
-            if col.startswith('yhat_') and col in colores:
-                modelo_name = col.replace('yhat_', '').replace('_', ' ').title()
-                
-                # Estilo especial para ensemble
-                if 'ensemble' in col:
-                    fig.add_trace(
-                        go.Scatter(
-                            x=df_predicciones['ds'],
-                            y=df_predicciones[col],
-                            mode='lines+markers',
-                            name=f'{modelo_name} (Principal)',
-                            line=dict(color=colores[col], width=4),
-                            marker=dict(size=6)
-                        ),
-                        row=1, col=1
-                    )
-                else:
-                    fig.add_trace(
-                        go.Scatter(
-                            x=df_predicciones['ds'],
-                            y=df_predicciones[col],
-                            mode='lines',
-                            name=modelo_name,
-                            line=dict(color=colores[col], width=2, dash='dot'),
-                            opacity=0.7
-                        ),
-                        row=1, col=1
-                    )
-        
-        # Agregar intervalos de confianza en el segundo subplot
-        if 'yhat_upper' in df_predicciones.columns and 'yhat_lower' in df_predicciones.columns:
-            fig.add_trace(
-                go.Scatter(
-                    x=df_predicciones['ds'],
-                    y=df_predicciones['yhat_upper'],
-                    mode='lines',
-                    name='Límite Superior',
-                    line=dict(color='rgba(108, 92, 231, 0.3)', width=1),
-                    showlegend=False
-                ),
-                row=2, col=1
-            )
-            
-            fig.add_trace(
-                go.Scatter(
-                    x=df_predicciones['ds'],
-                    y=df_predicciones['yhat_lower'],
-                    mode='lines',
-                    name='Límite Inferior',
-                    line=dict(color='rgba(108, 92, 231, 0.3)', width=1),
-                    fill='tonexty',
-                    fillcolor='rgba(108, 92, 231, 0.1)',
-                    showlegend=False
-                ),
-                row=2, col=1
-            )
-            
-            fig.add_trace(
-                go.Scatter(
-                    x=df_predicciones['ds'],
-                    y=df_predicciones['yhat_ensemble'],
-                    mode='lines',
-                    name='Predicción Ensemble',
-                    line=dict(color='#6C5CE7', width=3)
-                ),
-                row=2, col=1
-            )
-        
-        # Configurar layout
-        fig.update_layout(
-            height=800,
-            title="Comparación Detallada de Modelos de Predicción",
-            hovermode='x unified'
-        )
-        
-        fig.update_xaxes(title_text="Fecha", row=2, col=1)
-        fig.update_yaxes(title_text="Número de Llamadas", row=1, col=1)
-        fig.update_yaxes(title_text="Llamadas (con Incertidumbre)", row=2, col=1)
-        
+
+        # La construcción (y serialización a JSON) de la figura está cacheada;
+        # un rerun que no cambia predicciones ni histórico la reutiliza
+        fig = _construir_figura_predicciones(df_predicciones, df_historico)
+
         st.plotly_chart(fig, use_container_width=True)
     
     def mostrar_analisis_residuales(self, resultados, df_historico):
@@ -404,30 +1325,21 @@ class DashboardValidacionCEAPSI:
         # Simular datos de validación (en producción vendría del cross-validation)
         # Para este ejemplo, usaremos los últimos 30 días como datos de test
         if len(df_historico) > 30:
-            df_test = df_historico.tail(30).copy()
-            
-            # Simular predicciones para estos días (en producción serían las predicciones reales del modelo)
-            np.random.seed(42)
-            df_test['pred_ensemble'] = df_test['y'] + np.random.normal(0, 3, len(df_test))
-            df_test['residuales'] = df_test['y'] - df_test['pred_ensemble']
+            # Simulación determinista y cacheada (en producción serían las
+            # predicciones reales del modelo)
+            df_test = _simular_residuales(tuple(df_historico['y'].tail(30)))
             
             col1, col2 = st.columns(2)
             
             with col1:
-                # Gráfico de residuales vs predicciones
-                fig_residuales = px.scatter(
-                    df_test,
-                    x='pred_ensemble',
-                    y='residuales',
-                    title="Residuales vs Predicciones",
-                    labels={'pred_ensemble': 'Predicciones', 'residuales': 'Residuales'},
-                    trendline="lowess"
-                )
-                fig_residuales.add_hline(y=0, line_dash="dash", line_color="red")
+                # Gráfico de residuales vs predicciones (fit LOWESS cacheado)
+                fig_residuales = _figura_residuales_tendencia(df_test)
                 st.plotly_chart(fig_residuales, use_container_width=True)
             
             with col2:
-                # Histograma de residuales
+                # Histograma de residuales (import diferido de px)
+                import plotly.express as px
+
                 fig_hist = px.histogram(
                     df_test,
                     x='residuales',
@@ -437,13 +1349,19 @@ class DashboardValidacionCEAPSI:
                 fig_hist.add_vline(x=0, line_dash="dash", line_color="red")
                 st.plotly_chart(fig_hist, use_container_width=True)
             
-            # Métricas de diagnóstico
+            # Métricas de diagnóstico en una sola pasada numpy: r.dot(r)
+            # usa BLAS y evita las Series intermedias de las versiones pandas
             col1, col2, col3, col4 = st.columns(4)
-            
-            mae_test = mean_absolute_error(df_test['y'], df_test['pred_ensemble'])
-            rmse_test = np.sqrt(mean_squared_error(df_test['y'], df_test['pred_ensemble']))
-            bias = df_test['residuales'].mean()
-            
+
+            y = df_test['y'].to_numpy()
+            r = df_test['residuales'].to_numpy()
+            ssr = r.dot(r)
+
+            mae_test = np.abs(r).mean()
+            rmse_test = np.sqrt(ssr / len(r))
+            bias = r.mean()
+            r2_score = 1 - ssr / ((y - y.mean()) ** 2).sum()
+
             with col1:
                 st.metric("MAE Validación", f"{mae_test:.2f}")
             with col2:
@@ -451,7 +1369,6 @@ class DashboardValidacionCEAPSI:
             with col3:
                 st.metric("Bias", f"{bias:.2f}")
             with col4:
-                r2_score = 1 - (df_test['residuales']**2).sum() / ((df_test['y'] - df_test['y'].mean())**2).sum()
                 st.metric("R² Score", f"{r2_score:.3f}")
     
     def mostrar_alertas_validacion(self, resultados):
@@ -464,71 +1381,79 @@ class DashboardValidacionCEAPSI:
         
         st.subheader("🚨 Sistema de Alertas Validado")
         
-        # Agrupar alertas por severidad
-        alertas_por_severidad = {}
-        for alerta in alertas:
-            severidad = alerta.get('severidad', 'MEDIA')
-            if severidad not in alertas_por_severidad:
-                alertas_por_severidad[severidad] = []
-            alertas_por_severidad[severidad].append(alerta)
-        
-        # Mostrar alertas por severidad
-        for severidad in ['CRITICA', 'ALTA', 'MEDIA', 'BAJA']:
-            if severidad in alertas_por_severidad:
-                alertas_sev = alertas_por_severidad[severidad]
-                
-                # Color y emoji según severidad
-                config_severidad = {
-                    'CRITICA': {'color': 'red', 'emoji': '🔴', 'container': st.error},
-                    'ALTA': {'color': 'orange', 'emoji': '🟠', 'container': st.warning},
-                    'MEDIA': {'color': 'yellow', 'emoji': '🟡', 'container': st.info},
-                    'BAJA': {'color': 'blue', 'emoji': '🔵', 'container': st.info}
-                }
-                
-                config = config_severidad[severidad]
-                
-                with config['container'](f"{config['emoji']} Alertas {severidad} ({len(alertas_sev)})"):
-                    for alerta in alertas_sev:
-                        with st.expander(
-                            f"{alerta.get('tipo', 'ALERTA')} - {alerta.get('fecha', 'N/A')} "
-                            f"(Confianza: {alerta.get('confianza', 0):.0%})"
-                        ):
-                            col1, col2 = st.columns([2, 1])
-                            
-                            with col1:
-                                st.write(f"**Mensaje:** {alerta.get('mensaje', 'N/A')}")
-                                st.write(f"**Acción:** {alerta.get('accion', 'N/A')}")
-                                
-                                if 'valor_predicho' in alerta:
-                                    st.write(f"**Valor Predicho:** {alerta['valor_predicho']} llamadas")
-                                if 'umbral' in alerta:
-                                    st.write(f"**Umbral:** {alerta['umbral']} llamadas")
-                            
-                            with col2:
-                                # Medidor de confianza
-                                confianza = alerta.get('confianza', 0.5)
-                                fig_gauge = go.Figure(go.Indicator(
-                                    mode = "gauge+number",
-                                    value = confianza * 100,
-                                    domain = {'x': [0, 1], 'y': [0, 1]},
-                                    title = {'text': "Confianza"},
-                                    gauge = {
-                                        'axis': {'range': [None, 100]},
-                                        'bar': {'color': "darkblue"},
-                                        'steps': [
-                                            {'range': [0, 50], 'color': "lightgray"},
-                                            {'range': [50, 80], 'color': "yellow"},
-                                            {'range': [80, 100], 'color': "green"}
-                                        ],
-                                        'threshold': {
-                                            'line': {'color': "red", 'width': 4},
-                                            'thickness': 0.75,
-                                            'value': 90
-                                        }
-                                    }
-                                ))
-                                fig_gauge.update_layout(height=200, margin=dict(l=0, r=0, t=0, b=0))
+        # Agrupar por severidad con un categórico ordenado: un solo sort +
+        # groupby en C en lugar del dict de listas armado en Python
+        df_alertas = pd.DataFrame(alertas)
+
+        # Normalizar valores por defecto una sola vez (incluida severidad,
+        # que puede faltar por completo en resultados antiguos); el loop de
+        # render usa itertuples (acceso por atributo en C) en vez de
+        # dict.get por alerta
+        defaults = {'severidad': 'MEDIA', 'tipo': 'ALERTA', 'fecha': 'N/A',
+                    'mensaje': 'N/A', 'accion': 'N/A', 'confianza': 0.5}
+        for columna, valor in defaults.items():
+            if columna not in df_alertas.columns:
+                df_alertas[columna] = valor
+        df_alertas = df_alertas.fillna(defaults)
+
+        df_alertas['severidad'] = pd.Categorical(
+            df_alertas['severidad'],
+            categories=['CRITICA', 'ALTA', 'MEDIA', 'BAJA'],
+            ordered=True
+        )
+        df_alertas = df_alertas.sort_values('severidad')
+
+        for severidad, grupo in df_alertas.groupby('severidad', sort=False, observed=True):
+            config = _CONFIG_SEVERIDAD[severidad]
+
+            # Con muchas alertas del mismo nivel, N medidores individuales
+            # dominan el tiempo de render: se resumen en un solo gráfico de barras
+            mostrar_gauges = len(grupo) <= 20
+
+            with config['container'](f"{config['emoji']} Alertas {severidad} ({len(grupo)})"):
+                if not mostrar_gauges:
+                    fig_conf = go.Figure(go.Bar(
+                        x=[f"{row.tipo} {row.fecha}" for row in grupo.itertuples(index=False)],
+                        y=(grupo['confianza'] * 100).tolist(),
+                        marker_color=config['color']
+                    ))
+                    fig_conf.update_layout(
+                        height=250,
+                        yaxis_title="Confianza (%)",
+                        yaxis_range=[0, 100],
+                        margin=dict(l=0, r=0, t=10, b=0)
+                    )
+                    st.plotly_chart(fig_conf, use_container_width=True)
+
+                for alerta in grupo.itertuples(index=False):
+                    with st.expander(
+                        f"{alerta.tipo} - {alerta.fecha} "
+                        f"(Confianza: {alerta.confianza:.0%})"
+                    ):
+                        col1, col2 = st.columns([2, 1])
+
+                        with col1:
+                            st.write(f"**Mensaje:** {alerta.mensaje}")
+                            st.write(f"**Acción:** {alerta.accion}")
+
+                            valor_predicho = getattr(alerta, 'valor_predicho', None)
+                            if pd.notna(valor_predicho):
+                                st.write(f"**Valor Predicho:** {valor_predicho} llamadas")
+                            umbral = getattr(alerta, 'umbral', None)
+                            if pd.notna(umbral):
+                                st.write(f"**Umbral:** {umbral} llamadas")
+
+                        with col2:
+                            if mostrar_gauges and severidad in ('CRITICA', 'ALTA'):
+                                # Clon superficial de la plantilla: solo cambia el valor
+                                fig_gauge = go.Figure(_GAUGE_TEMPLATE)
+                                fig_gauge.data[0].value = alerta.confianza * 100
                                 st.plotly_chart(fig_gauge, use_container_width=True)
+                            elif mostrar_gauges:
+                                # Severidades menores: barra nativa, sin pagar
+                                # una figura Plotly por alerta
+                                st.progress(min(float(alerta.confianza), 1.0),
+                                            text=f"Confianza: {alerta.confianza * 100:.0f}%")
     
     def mostrar_recomendaciones_mejora(self, resultados):
         """Muestra recomendaciones específicas para mejorar el modelo"""
@@ -538,11 +1463,17 @@ class DashboardValidacionCEAPSI:
         pesos_ensemble = resultados.get('pesos_ensemble', {})
         
         recomendaciones = []
-        
+
+        # Consolidar metadatos en un DataFrame: una sola pasada vectorizada
+        # en lugar de iterar el dict una vez por métrica
+        dfm = pd.DataFrame.from_dict(metadatos_modelos, orient='index')
+        mae_serie = dfm.get('mae_validacion', pd.Series(index=dfm.index, dtype=float))
+        if 'mae_cv' in dfm.columns:
+            mae_serie = mae_serie.fillna(dfm['mae_cv'])
+
         # Análisis de performance general
-        maes = [m.get('mae_validacion', m.get('mae_cv', 100)) for m in metadatos_modelos.values()]
-        mae_promedio = np.mean(maes) if maes else 100
-        
+        mae_promedio = mae_serie.fillna(100).mean() if len(dfm) else 100
+
         if mae_promedio > 20:
             recomendaciones.append({
                 'tipo': 'PRECISION_BAJA',
@@ -555,9 +1486,10 @@ class DashboardValidacionCEAPSI:
         
         # Análisis de balance de ensemble
         if pesos_ensemble:
-            peso_max = max(pesos_ensemble.values())
+            pesos_serie = pd.Series(pesos_ensemble)
+            peso_max = pesos_serie.max()
             if peso_max > 0.6:
-                modelo_dominante = max(pesos_ensemble, key=pesos_ensemble.get)
+                modelo_dominante = pesos_serie.idxmax()
                 recomendaciones.append({
                     'tipo': 'ENSEMBLE_DESBALANCEADO',
                     'prioridad': 'MEDIA',
@@ -567,18 +1499,20 @@ class DashboardValidacionCEAPSI:
                     'impacto': 'MEDIO'
                 })
         
-        # Análisis de modelos individuales
-        for modelo, metadata in metadatos_modelos.items():
-            mae_modelo = metadata.get('mae_validacion', metadata.get('mae_cv', 0))
-            if mae_modelo > 30:
-                recomendaciones.append({
-                    'tipo': 'MODELO_POOR_PERFORMANCE',
-                    'prioridad': 'MEDIA',
-                    'titulo': f'Performance Baja - {modelo.title()}',
-                    'problema': f'MAE de {mae_modelo:.1f} muy alto para {modelo}',
-                    'solucion': f'Optimizar hiperparámetros de {modelo} o considerar reemplazar',
-                    'impacto': 'MEDIO'
-                })
+        # Análisis de modelos individuales: máscara booleana sobre la serie
+        # en lugar de un if por modelo
+        mae_bajo_rendimiento = mae_serie[mae_serie.fillna(0) > 30]
+        recomendaciones.extend([
+            {
+                'tipo': 'MODELO_POOR_PERFORMANCE',
+                'prioridad': 'MEDIA',
+                'titulo': f'Performance Baja - {modelo.title()}',
+                'problema': f'MAE de {mae_modelo:.1f} muy alto para {modelo}',
+                'solucion': f'Optimizar hiperparámetros de {modelo} o considerar reemplazar',
+                'impacto': 'MEDIO'
+            }
+            for modelo, mae_modelo in mae_bajo_rendimiento.items()
+        ])
         
         # Recomendaciones por datos faltantes
         if len(metadatos_modelos) < 3:
@@ -627,13 +1561,14 @@ class DashboardValidacionCEAPSI:
             return
         
         # Filtrar por tipo de llamada si está disponible la columna SENTIDO
+        # (sin .copy(): df_filtrado solo se agrega, nunca se muta)
         if 'SENTIDO' in df_completo.columns:
             if tipo_llamada == 'ENTRANTE':
-                df_filtrado = df_completo[df_completo['SENTIDO'] == 'in'].copy()
+                df_filtrado = df_completo[df_completo['SENTIDO'] == 'in']
             else:
-                df_filtrado = df_completo[df_completo['SENTIDO'] == 'out'].copy()
+                df_filtrado = df_completo[df_completo['SENTIDO'] == 'out']
         else:
-            df_filtrado = df_completo.copy()
+            df_filtrado = df_completo
             st.info("ℹ️ Mostrando datos combinados (no se pudo filtrar por tipo)")
         
         # Calcular fecha límite para cada período
@@ -642,31 +1577,45 @@ class DashboardValidacionCEAPSI:
         fecha_30d = fecha_actual - timedelta(days=30)
         fecha_90d = fecha_actual - timedelta(days=90)
         
-        # Agregar datos por día
-        df_diario = df_filtrado.groupby('fecha_solo').agg({
-            'TELEFONO': 'count',  # Total de llamadas
-            'ATENDIDA': lambda x: (x == 'Si').sum() if 'ATENDIDA' in df_filtrado.columns else 0,  # Llamadas atendidas
-            'hora': 'mean'  # Hora promedio (para referencia)
-        }).reset_index()
-        
-        df_diario.columns = ['fecha', 'total_llamadas', 'llamadas_atendidas', 'hora_promedio']
-        df_diario['fecha'] = pd.to_datetime(df_diario['fecha'])
-        
-        # Calcular porcentaje de atención
-        df_diario['porcentaje_atencion'] = (df_diario['llamadas_atendidas'] / df_diario['total_llamadas'] * 100).fillna(0)
-        
-        # Filtrar por períodos
-        df_15d = df_diario[df_diario['fecha'] >= pd.to_datetime(fecha_15d)]
-        df_30d = df_diario[df_diario['fecha'] >= pd.to_datetime(fecha_30d)]
-        df_90d = df_diario[df_diario['fecha'] >= pd.to_datetime(fecha_90d)]
-        
+        # Agregación diaria cacheada a nivel de módulo: el groupby pesado
+        # solo corre cuando cambia el frame filtrado, no por rerun
+        df_diario = _agregados_atencion_diaria(df_filtrado, tipo_llamada)
+
+        # Cortes de período por búsqueda binaria sobre la serie ya ordenada:
+        # tres searchsorted O(log N) en lugar de tres máscaras booleanas O(N)
+        fechas_arr = df_diario['fecha'].to_numpy()
+        limites = np.array([fecha_90d, fecha_30d, fecha_15d],
+                           dtype='datetime64[ns]')
+        i90, i30, i15 = np.searchsorted(fechas_arr, limites)
+        df_15d = df_diario.iloc[i15:]
+        df_30d = df_diario.iloc[i30:]
+        df_90d = df_diario.iloc[i90:]
+
+        # Las ventanas se solapan (15 ⊂ 30 ⊂ 90), así que medias y totales
+        # salen de UNA suma acumulada por columna en vez de seis pasadas
+        # independientes; se reutilizan en métricas, líneas de referencia
+        # y barras comparativas
+        n = len(df_diario)
+        acum_pct = np.concatenate(([0.0], np.cumsum(
+            df_diario['porcentaje_atencion'].to_numpy(dtype='float64'))))
+        acum_tot = np.concatenate(([0], np.cumsum(
+            df_diario['total_llamadas'].to_numpy(dtype='int64'))))
+
+        def _media_ventana(i):
+            return (acum_pct[n] - acum_pct[i]) / (n - i) if n > i else None
+
+        promedio_15d = _media_ventana(i15)
+        promedio_30d = _media_ventana(i30)
+        promedio_90d = _media_ventana(i90)
+        llamadas_15d = int(acum_tot[n] - acum_tot[i15])
+        llamadas_30d = int(acum_tot[n] - acum_tot[i30])
+        llamadas_90d = int(acum_tot[n] - acum_tot[i90])
+
         # Crear métricas resumen
         col1, col2, col3 = st.columns(3)
-        
+
         with col1:
-            if len(df_15d) > 0:
-                promedio_15d = df_15d['porcentaje_atencion'].mean()
-                llamadas_15d = df_15d['total_llamadas'].sum()
+            if promedio_15d is not None:
                 st.metric(
                     "📅 Últimos 15 días",
                     f"{promedio_15d:.1f}%",
@@ -674,11 +1623,9 @@ class DashboardValidacionCEAPSI:
                 )
             else:
                 st.metric("📅 Últimos 15 días", "Sin datos", "")
-        
+
         with col2:
-            if len(df_30d) > 0:
-                promedio_30d = df_30d['porcentaje_atencion'].mean()
-                llamadas_30d = df_30d['total_llamadas'].sum()
+            if promedio_30d is not None:
                 st.metric(
                     "📅 Últimos 30 días",
                     f"{promedio_30d:.1f}%",
@@ -686,11 +1633,9 @@ class DashboardValidacionCEAPSI:
                 )
             else:
                 st.metric("📅 Últimos 30 días", "Sin datos", "")
-        
+
         with col3:
-            if len(df_90d) > 0:
-                promedio_90d = df_90d['porcentaje_atencion'].mean()
-                llamadas_90d = df_90d['total_llamadas'].sum()
+            if promedio_90d is not None:
                 st.metric(
                     "📅 Últimos 90 días",
                     f"{promedio_90d:.1f}%",
@@ -701,143 +1646,19 @@ class DashboardValidacionCEAPSI:
         
         # Crear gráfica comparativa
         if len(df_90d) > 0:
-            fig = make_subplots(
-                rows=2, cols=2,
-                subplot_titles=(
-                    "Porcentaje de Atención por Día (Últimos 90 días)",
-                    "Comparación de Promedios por Período",
-                    "Volumen de Llamadas Diarias",
-                    "Tendencia de Atención (Últimos 30 días)"
-                ),
-                specs=[[{"colspan": 2}, None],
-                       [{}, {}]],
-                vertical_spacing=0.12
-            )
-            
-            # Gráfica principal: línea de tiempo de atención
-            fig.add_trace(
-                go.Scatter(
-                    x=df_90d['fecha'],
-                    y=df_90d['porcentaje_atencion'],
-                    mode='lines+markers',
-                    name='% Atención Diaria',
-                    line=dict(color='#1f77b4', width=2),
-                    marker=dict(size=4),
-                    hovertemplate='<b>%{x}</b><br>Atención: %{y:.1f}%<extra></extra>'
-                ),
-                row=1, col=1
-            )
-            
-            # Líneas de referencia para períodos
-            if len(df_15d) > 0:
-                fig.add_hline(
-                    y=df_15d['porcentaje_atencion'].mean(),
-                    line_dash="dash",
-                    line_color="red",
-                    annotation_text=f"Promedio 15d: {df_15d['porcentaje_atencion'].mean():.1f}%",
-                    row=1, col=1
-                )
-            
-            if len(df_30d) > 0:
-                fig.add_hline(
-                    y=df_30d['porcentaje_atencion'].mean(),
-                    line_dash="dot",
-                    line_color="orange",
-                    annotation_text=f"Promedio 30d: {df_30d['porcentaje_atencion'].mean():.1f}%",
-                    row=1, col=1
-                )
-            
-            # Gráfica de barras: comparación de promedios
-            periodos = []
-            promedios = []
-            colores = []
-            
-            if len(df_15d) > 0:
-                periodos.append('15 días')
-                promedios.append(df_15d['porcentaje_atencion'].mean())
-                colores.append('#ff7f0e')
-            
-            if len(df_30d) > 0:
-                periodos.append('30 días')
-                promedios.append(df_30d['porcentaje_atencion'].mean())
-                colores.append('#2ca02c')
-            
-            if len(df_90d) > 0:
-                periodos.append('90 días')
-                promedios.append(df_90d['porcentaje_atencion'].mean())
-                colores.append('#d62728')
-            
-            if periodos:
-                fig.add_trace(
-                    go.Bar(
-                        x=periodos,
-                        y=promedios,
-                        name='Promedio por Período',
-                        marker_color=colores,
-                        text=[f'{p:.1f}%' for p in promedios],
-                        textposition='auto',
-                        hovertemplate='<b>%{x}</b><br>Promedio: %{y:.1f}%<extra></extra>'
-                    ),
-                    row=2, col=1
-                )
-            
-            # Gráfica de volumen de llamadas
-            fig.add_trace(
-                go.Bar(
-                    x=df_30d['fecha'] if len(df_30d) > 0 else [],
-                    y=df_30d['total_llamadas'] if len(df_30d) > 0 else [],
-                    name='Llamadas Diarias',
-                    marker_color='lightblue',
-                    opacity=0.7,
-                    hovertemplate='<b>%{x}</b><br>Llamadas: %{y}<extra></extra>'
-                ),
-                row=2, col=2
-            )
-            
-            # Configurar layout
-            fig.update_layout(
-                height=800,
-                title=f"Análisis de Atención - Llamadas {tipo_llamada}",
-                showlegend=True
-            )
-            
-            fig.update_xaxes(title_text="Fecha", row=1, col=1)
-            fig.update_yaxes(title_text="Porcentaje de Atención (%)", row=1, col=1)
-            fig.update_xaxes(title_text="Período", row=2, col=1)
-            fig.update_yaxes(title_text="Promedio Atención (%)", row=2, col=1)
-            fig.update_xaxes(title_text="Fecha", row=2, col=2)
-            fig.update_yaxes(title_text="Número de Llamadas", row=2, col=2)
-            
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Tabla resumen por día de la semana
+            fig = _construir_figura_atencion(df_30d, df_90d, promedio_15d,
+                                             promedio_30d, promedio_90d,
+                                             tipo_llamada)
+            # key estable + theme=None: Streamlit reutiliza el elemento en
+            # vez de desmontarlo y re-aplicar el tema en cada rerun
+            st.plotly_chart(fig, use_container_width=True,
+                            key=f'atencion_{tipo_llamada}', theme=None)
+            
+            # Tabla resumen por día de la semana (HTML cacheado por serie)
             if len(df_30d) > 0:
                 st.subheader("📊 Resumen por Día de la Semana (Últimos 30 días)")
-                
-                df_30d = df_30d.copy()
-                df_30d['dia_semana'] = df_30d['fecha'].dt.day_name()
-                resumen_semanal = df_30d.groupby('dia_semana').agg({
-                    'porcentaje_atencion': ['mean', 'std'],
-                    'total_llamadas': ['mean', 'sum'],
-                    'llamadas_atendidas': 'sum'
-                }).round(2)
-                
-                resumen_semanal.columns = ['Atención Promedio (%)', 'Desv. Estándar (%)', 'Llamadas Promedio/Día', 'Total Llamadas', 'Total Atendidas']
-                
-                # Ordenar por días de la semana
-                orden_dias = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                resumen_semanal = resumen_semanal.reindex([dia for dia in orden_dias if dia in resumen_semanal.index])
-                
-                st.dataframe(
-                    resumen_semanal.style.format({
-                        'Atención Promedio (%)': '{:.1f}%',
-                        'Desv. Estándar (%)': '{:.1f}%',
-                        'Llamadas Promedio/Día': '{:.0f}',
-                        'Total Llamadas': '{:,.0f}',
-                        'Total Atendidas': '{:,.0f}'
-                    }).background_gradient(subset=['Atención Promedio (%)'], cmap='RdYlGn'),
-                    use_container_width=True
-                )
+                st.markdown(_tabla_resumen_semanal_html(df_30d),
+                            unsafe_allow_html=True)
         else:
             st.warning("⚠️ No hay datos suficientes para generar las gráficas")
     
@@ -856,55 +1677,80 @@ class DashboardValidacionCEAPSI:
         # Obtener valores actuales
         metadatos_modelos = resultados.get('metadatos_modelos', {})
         if metadatos_modelos:
-            maes = [m.get('mae_validacion', m.get('mae_cv', 0)) for m in metadatos_modelos.values() if m.get('mae_validacion', m.get('mae_cv', 0)) > 0]
-            rmses = [m.get('rmse_validacion', m.get('rmse_cv', 0)) for m in metadatos_modelos.values() if m.get('rmse_validacion', m.get('rmse_cv', 0)) > 0]
-            
-            if maes:
-                objetivos['MAE']['actual'] = min(maes)  # Mejor MAE
-            if rmses:
-                objetivos['RMSE']['actual'] = min(rmses)  # Mejor RMSE
-            
-            # Simular MAPE y precisión de alertas
-            objetivos['MAPE']['actual'] = np.random.uniform(15, 35)
-            objetivos['Precision_Alertas']['actual'] = np.random.uniform(75, 95)
-        
-        # Mostrar métricas
-        col1, col2, col3, col4 = st.columns(4)
-        
-        for i, (metrica, data) in enumerate(objetivos.items()):
-            with [col1, col2, col3, col4][i]:
-                
-                # Calcular progreso
-                if metrica in ['MAE', 'RMSE', 'MAPE']:  # Menor es mejor
-                    progreso = max(0, min(100, (data['objetivo'] - data['actual']) / data['objetivo'] * 100))
-                    color = 'normal' if data['actual'] <= data['objetivo'] else 'inverse'
-                else:  # Mayor es mejor
-                    progreso = min(100, data['actual'] / data['objetivo'] * 100)
-                    color = 'normal'
-                
-                # Determinar estado
-                if progreso >= 90:
-                    emoji = "🎉"
-                    estado = "Objetivo Alcanzado"
-                elif progreso >= 70:
-                    emoji = "✅"
-                    estado = "En Camino"
-                elif progreso >= 50:
-                    emoji = "⚠️"
-                    estado = "Requiere Atención"
-                else:
-                    emoji = "❌"
-                    estado = "Crítico"
-                
-                st.metric(
-                    f"{emoji} {metrica.replace('_', ' ')}",
-                    f"{data['actual']:.1f} {data['unidad']}",
-                    f"Objetivo: {data['objetivo']} {data['unidad']}"
-                )
-                
-                # Barra de progreso
-                st.progress(progreso / 100)
-                st.caption(f"{estado} ({progreso:.0f}%)")
+            # Mínimos corrientes en una sola pasada sobre los metadatos:
+            # sin listas intermedias ni .get duplicado entre filtro y valor
+            mejor_mae = mejor_rmse = mejor_mape = math.inf
+            for m in metadatos_modelos.values():
+                v = m.get('mae_validacion') or m.get('mae_cv') or 0
+                if 0 < v < mejor_mae:
+                    mejor_mae = v
+                v = m.get('rmse_validacion') or m.get('rmse_cv') or 0
+                if 0 < v < mejor_rmse:
+                    mejor_rmse = v
+                v = m.get('mape_validacion') or m.get('mape_cv') or 0
+                if 0 < v < mejor_mape:
+                    mejor_mape = v
+
+            if mejor_mae < math.inf:
+                objetivos['MAE']['actual'] = mejor_mae  # Mejor MAE
+            if mejor_rmse < math.inf:
+                objetivos['RMSE']['actual'] = mejor_rmse  # Mejor RMSE
+
+            # MAPE real desde los metadatos y precisión desde la confianza
+            # de las alertas; ambos deterministas, así el render es estable
+            # entre reruns. La simulación cacheada queda solo como respaldo
+            # para archivos de resultados antiguos sin esos campos.
+            confianzas = [a['confianza'] for a in resultados.get('alertas', [])
+                          if isinstance(a, dict) and a.get('confianza') is not None]
+
+            simulados = None
+            if mejor_mape == math.inf or not confianzas:
+                clave_cache = f"{resultados.get('tipo_llamada', 'NA')}:{datetime.now().date()}"
+                simulados = _simular_metricas_objetivo(clave_cache)
+
+            objetivos['MAPE']['actual'] = (mejor_mape if mejor_mape < math.inf
+                                           else simulados['MAPE'])
+            objetivos['Precision_Alertas']['actual'] = (
+                float(np.mean(confianzas)) * 100 if confianzas
+                else simulados['Precision_Alertas'])
+        
+        # Mostrar métricas: las 4 tarjetas en un solo render HTML
+        tarjetas = []
+        for metrica, data in objetivos.items():
+            # Calcular progreso
+            if metrica in ['MAE', 'RMSE', 'MAPE']:  # Menor es mejor
+                progreso = max(0, min(100, (data['objetivo'] - data['actual']) / data['objetivo'] * 100))
+            else:  # Mayor es mejor
+                progreso = min(100, data['actual'] / data['objetivo'] * 100)
+
+            # Determinar estado
+            if progreso >= 90:
+                emoji = "🎉"
+                estado = "Objetivo Alcanzado"
+            elif progreso >= 70:
+                emoji = "✅"
+                estado = "En Camino"
+            elif progreso >= 50:
+                emoji = "⚠️"
+                estado = "Requiere Atención"
+            else:
+                emoji = "❌"
+                estado = "Crítico"
+
+            tarjetas.append(_PLANTILLA_TARJETA_OBJETIVO.format(
+                emoji=emoji,
+                metrica=metrica.replace('_', ' '),
+                actual=data['actual'],
+                unidad=data['unidad'],
+                objetivo=data['objetivo'],
+                progreso=progreso,
+                estado=estado
+            ))
+
+        st.markdown(
+            '<div style="display:flex;gap:1rem">' + ''.join(tarjetas) + '</div>',
+            unsafe_allow_html=True
+        )
     
     def ejecutar_dashboard(self):
         """Ejecuta el dashboard principal con diseño simplificado y mejor UX"""
@@ -1212,9 +2058,8 @@ class DashboardValidacionCEAPSI:
             ).fillna(0)
             
             # Ordenar días correctamente (Lunes a Domingo)
-            dias_orden = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-            columnas_ordenadas = [dia for dia in dias_orden if dia in pivot_data.columns]
-            
+            columnas_ordenadas = _ORDEN_DIAS.intersection(pivot_data.columns, sort=False)
+
             if len(columnas_ordenadas) > 0:
                 pivot_data = pivot_data[columnas_ordenadas]
                 
@@ -1238,7 +2083,27 @@ class DashboardValidacionCEAPSI:
                 st.plotly_chart(fig, use_container_width=True)
             else:
                 st.info("📊 No hay suficientes datos para mostrar el patrón semanal")
-                
+
+            # Vistas detalladas bajo demanda: el radio renderiza solo la
+            # seleccionada, así cada rerun construye una figura y no las tres
+            vista = st.radio(
+                'Vista detallada',
+                ['Ninguna', 'Semanal', 'Horaria', 'Combinada'],
+                horizontal=True,
+                key=f'vista_heatmap_{tipo_llamada}'
+            )
+            if vista != 'Ninguna':
+                df_completo = self.cargar_datos_llamadas_completos()
+                if df_completo is not None:
+                    df_filtrado = self._preparar_datos_heatmap(df_completo, tipo_llamada)
+                    if len(df_filtrado) > 0:
+                        if vista == 'Semanal':
+                            self._mostrar_heatmap_semanal(df_filtrado, tipo_llamada)
+                        elif vista == 'Horaria':
+                            self._mostrar_heatmap_horario(df_filtrado, tipo_llamada)
+                        else:
+                            self._mostrar_heatmap_combinado(df_filtrado, tipo_llamada)
+
         except Exception as e:
             st.error(f"Error generando heatmap: {e}")
             st.info("📊 No se puede generar el patrón temporal en este momento")
@@ -1280,19 +2145,7 @@ class DashboardValidacionCEAPSI:
             
             if len(datos_por_hora) > 0:
                 df_horas = pd.DataFrame(datos_por_hora)
-                
-                # Crear heatmap por hora
-                pivot_horas = df_horas.pivot_table(
-                    values='llamadas',
-                    index='hora',
-                    columns='fecha',
-                    aggfunc='sum'
-                ).fillna(0)
-                
-                # Tomar solo las últimas 14 fechas para que sea legible
-                if pivot_horas.shape[1] > 14:
-                    pivot_horas = pivot_horas.iloc[:, -14:]
-                
+
                 # Crear gráfico de barras por hora (más fácil de leer)
                 horas_promedio = df_horas.groupby('hora')['llamadas'].mean().reset_index()
                 
@@ -1351,266 +2204,218 @@ class DashboardValidacionCEAPSI:
             st.info("📊 No se puede mostrar el análisis por hora en este momento")
     
     def _preparar_datos_heatmap(self, df_completo, tipo_llamada):
-        """Prepara los datos para generar heatmaps"""
-        try:
-            # Filtrar por tipo de llamada si no son datos de ejemplo
-            if 'SENTIDO' in df_completo.columns:
-                sentido_filter = 'in' if tipo_llamada.upper() == 'ENTRANTE' else 'out'
-                df_filtrado = df_completo[df_completo['SENTIDO'] == sentido_filter].copy()
-            else:
-                # Para datos de ejemplo que no tienen SENTIDO
-                df_filtrado = df_completo.copy()
-            
-            # Convertir fechas
-            df_filtrado['FECHA'] = pd.to_datetime(df_filtrado['FECHA'], errors='coerce')
-            
-            # Filtrar datos válidos
-            df_filtrado = df_filtrado.dropna(subset=['FECHA'])
-            
-            # Agregar columnas temporales
-            df_filtrado['dia_semana'] = df_filtrado['FECHA'].dt.day_name()
-            df_filtrado['dia_semana_num'] = df_filtrado['FECHA'].dt.dayofweek
-            df_filtrado['hora'] = df_filtrado['FECHA'].dt.hour
-            df_filtrado['fecha_solo'] = df_filtrado['FECHA'].dt.date
-            df_filtrado['semana'] = df_filtrado['FECHA'].dt.isocalendar().week
-            df_filtrado['mes'] = df_filtrado['FECHA'].dt.month
-            
-            return df_filtrado
-            
-        except Exception as e:
-            st.error(f"Error preparando datos: {e}")
-            return pd.DataFrame()
+        """Prepara los datos para generar heatmaps (delegado cacheado)"""
+        return _preparar_datos_heatmap_cached(df_completo, tipo_llamada)
     
     def _mostrar_heatmap_semanal(self, df_filtrado, tipo_llamada):
         """Muestra heatmap de patrones por día de la semana"""
         
         st.subheader(f"🗓️ Patrón de Llamadas {tipo_llamada} por Día de la Semana")
         
-        try:
-            # Agrupar por día de la semana y semana del año
-            agrupacion = df_filtrado.groupby(['semana', 'dia_semana_num']).size().reset_index(name='llamadas')
-            
-            # Crear matriz para el heatmap
-            dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-            
-            # Pivot para crear matriz
-            matriz_semanal = agrupacion.pivot(index='semana', columns='dia_semana_num', values='llamadas')
-            matriz_semanal = matriz_semanal.fillna(0)
-            
-            # Asegurar que tenemos todas las columnas (días de la semana)
-            for i in range(7):
-                if i not in matriz_semanal.columns:
-                    matriz_semanal[i] = 0
-            
-            # Ordenar columnas
-            matriz_semanal = matriz_semanal[sorted(matriz_semanal.columns)]
-            
-            # Crear heatmap con Plotly
-            fig_semanal = go.Figure(data=go.Heatmap(
-                z=matriz_semanal.values,
-                x=[dias_semana[i] for i in sorted(matriz_semanal.columns)],
-                y=[f'Semana {int(semana)}' for semana in matriz_semanal.index],
-                colorscale='Blues',
-                hoverinfo='all',
-                hovertemplate='<b>%{y}</b><br>%{x}<br>Llamadas: %{z}<extra></extra>',
-                colorbar=dict(title="Número de Llamadas")
-            ))
-            
-            fig_semanal.update_layout(
-                title=f'Distribución Semanal de Llamadas {tipo_llamada}',
-                xaxis_title='Día de la Semana',
-                yaxis_title='Semana del Año',
-                height=400,
-                font=dict(size=12)
-            )
-            
-            st.plotly_chart(fig_semanal, use_container_width=True)
-            
-            # Métricas de resumen semanal
-            col1, col2, col3 = st.columns(3)
-            
-            # Calcular estadísticas por día
-            stats_diarios = df_filtrado.groupby('dia_semana')['FECHA'].count()
-            
-            with col1:
-                dia_mas_activo = stats_diarios.idxmax()
-                max_llamadas = stats_diarios.max()
-                st.metric("📈 Día Más Activo", dia_mas_activo, f"{max_llamadas} llamadas")
-            
-            with col2:
-                dia_menos_activo = stats_diarios.idxmin()
-                min_llamadas = stats_diarios.min()
-                st.metric("📉 Día Menos Activo", dia_menos_activo, f"{min_llamadas} llamadas")
-            
-            with col3:
-                variacion = ((max_llamadas - min_llamadas) / min_llamadas * 100) if min_llamadas > 0 else 0
-                st.metric("📊 Variación Semanal", f"{variacion:.1f}%")
-            
-        except Exception as e:
-            st.error(f"Error generando heatmap semanal: {e}")
-    
+        # Vista semanal derivada del cubo compartido (suma sobre horas)
+        dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+        cubo, semanas_unicas = _calcular_cubo_temporal(df_filtrado)
+        matriz_semanal = pd.DataFrame(cubo.sum(axis=2), index=semanas_unicas,
+                                      columns=range(7))
+
+        # Crear heatmap con Plotly
+        fig_semanal = go.Figure(data=go.Heatmap(
+            z=matriz_semanal.values,
+            x=[dias_semana[i] for i in matriz_semanal.columns],
+            y=[f'Semana {int(semana)}' for semana in matriz_semanal.index],
+            colorscale='Blues',
+            hoverinfo='all',
+            hovertemplate='<b>%{y}</b><br>%{x}<br>Llamadas: %{z}<extra></extra>',
+            colorbar=dict(title="Número de Llamadas")
+        ))
+        
+        fig_semanal.update_layout(
+            title=f'Distribución Semanal de Llamadas {tipo_llamada}',
+            xaxis_title='Día de la Semana',
+            yaxis_title='Semana del Año',
+            height=400,
+            font=dict(size=12)
+        )
+        
+        st.plotly_chart(fig_semanal, use_container_width=True)
+        
+        # Métricas de resumen semanal
+        col1, col2, col3 = st.columns(3)
+        
+        # Estadísticas por día derivadas de la misma matriz semanal
+        # (clave entera; el nombre en español se resuelve al mostrar).
+        # Solo días con tráfico: los fines de semana se filtran aguas
+        # arriba y sus ceros falsearían el mínimo y la variación
+        stats_diarios = matriz_semanal.sum(axis=0)
+        stats_diarios = stats_diarios[stats_diarios > 0]
+        if stats_diarios.empty:
+            st.info("Sin llamadas en el período seleccionado")
+            return
+
+        with col1:
+            dia_mas_activo = dias_semana[stats_diarios.idxmax()]
+            max_llamadas = stats_diarios.max()
+            st.metric("📈 Día Más Activo", dia_mas_activo, f"{max_llamadas} llamadas")
+
+        with col2:
+            dia_menos_activo = dias_semana[stats_diarios.idxmin()]
+            min_llamadas = stats_diarios.min()
+            st.metric("📉 Día Menos Activo", dia_menos_activo, f"{min_llamadas} llamadas")
+        
+        with col3:
+            variacion = ((max_llamadas - min_llamadas) / min_llamadas * 100) if min_llamadas > 0 else 0
+            st.metric("📊 Variación Semanal", f"{variacion:.1f}%")
+        
     def _mostrar_heatmap_horario(self, df_filtrado, tipo_llamada):
         """Muestra heatmap de patrones por hora del día"""
         
         st.subheader(f"🕐 Patrón de Llamadas {tipo_llamada} por Hora del Día")
         
-        try:
-            # Agrupar por día y hora
-            agrupacion_horaria = df_filtrado.groupby(['fecha_solo', 'hora']).size().reset_index(name='llamadas')
-            
-            # Crear matriz para el heatmap
-            matriz_horaria = agrupacion_horaria.pivot(index='fecha_solo', columns='hora', values='llamadas')
-            matriz_horaria = matriz_horaria.fillna(0)
-            
-            # Asegurar que tenemos todas las horas (0-23)
-            for hora in range(24):
-                if hora not in matriz_horaria.columns:
-                    matriz_horaria[hora] = 0
-            
-            # Ordenar columnas
-            matriz_horaria = matriz_horaria[sorted(matriz_horaria.columns)]
-            
-            # Limitar a últimos 30 días para mejor visualización
-            if len(matriz_horaria) > 30:
-                matriz_horaria = matriz_horaria.tail(30)
-            
-            # Crear heatmap con Plotly
-            fig_horario = go.Figure(data=go.Heatmap(
-                z=matriz_horaria.values,
-                x=[f'{h:02d}:00' for h in sorted(matriz_horaria.columns)],
-                y=[str(fecha) for fecha in matriz_horaria.index],
-                colorscale='Viridis',
-                hoverinfo='all',
-                hovertemplate='<b>%{y}</b><br>%{x}<br>Llamadas: %{z}<extra></extra>',
-                colorbar=dict(title="Número de Llamadas")
-            ))
-            
-            fig_horario.update_layout(
-                title=f'Distribución Horaria de Llamadas {tipo_llamada} (Últimos 30 días)',
-                xaxis_title='Hora del Día',
-                yaxis_title='Fecha',
-                height=500,
-                font=dict(size=12)
-            )
-            
-            # Rotar etiquetas del eje Y para mejor legibilidad
-            fig_horario.update_yaxes(tickangle=0)
-            fig_horario.update_xaxes(tickangle=45)
-            
-            st.plotly_chart(fig_horario, use_container_width=True)
-            
-            # Métricas de resumen horario
-            col1, col2, col3 = st.columns(3)
-            
-            # Calcular estadísticas por hora
-            stats_horarios = df_filtrado.groupby('hora')['FECHA'].count()
-            
-            with col1:
-                hora_pico = stats_horarios.idxmax()
-                max_llamadas_hora = stats_horarios.max()
-                st.metric("🔥 Hora Pico", f"{hora_pico:02d}:00", f"{max_llamadas_hora} llamadas")
-            
-            with col2:
-                hora_valle = stats_horarios.idxmin()
-                min_llamadas_hora = stats_horarios.min()
-                st.metric("🌙 Hora Valle", f"{hora_valle:02d}:00", f"{min_llamadas_hora} llamadas")
-            
-            with col3:
-                # Calcular horario laboral (8-18)
-                llamadas_laborales = df_filtrado[(df_filtrado['hora'] >= 8) & (df_filtrado['hora'] <= 18)]
-                pct_laborales = (len(llamadas_laborales) / len(df_filtrado) * 100) if len(df_filtrado) > 0 else 0
-                st.metric("🏢 % Horario Laboral", f"{pct_laborales:.1f}%")
-            
-        except Exception as e:
-            st.error(f"Error generando heatmap horario: {e}")
-    
+        # Histograma fecha x hora pre-agregado (cacheado a disco)
+        mat, fechas_unicas = _contar_fecha_hora(df_filtrado)
+        matriz_horaria = pd.DataFrame(mat, index=pd.DatetimeIndex(fechas_unicas),
+                                      columns=range(24))
+
+        # Limitar a últimos 30 días para mejor visualización
+        if len(matriz_horaria) > 30:
+            matriz_horaria = matriz_horaria.tail(30)
+
+        # Crear heatmap con Plotly
+        fig_horario = go.Figure(data=go.Heatmap(
+            z=matriz_horaria.values,
+            x=[f'{h:02d}:00' for h in matriz_horaria.columns],
+            y=[str(fecha.date()) for fecha in matriz_horaria.index],
+            colorscale='Viridis',
+            hoverinfo='all',
+            hovertemplate='<b>%{y}</b><br>%{x}<br>Llamadas: %{z}<extra></extra>',
+            colorbar=dict(title="Número de Llamadas")
+        ))
+        
+        fig_horario.update_layout(
+            title=f'Distribución Horaria de Llamadas {tipo_llamada} (Últimos 30 días)',
+            xaxis_title='Hora del Día',
+            yaxis_title='Fecha',
+            height=500,
+            font=dict(size=12)
+        )
+        
+        # Rotar etiquetas del eje Y para mejor legibilidad
+        fig_horario.update_yaxes(tickangle=0)
+        fig_horario.update_xaxes(tickangle=45)
+        
+        st.plotly_chart(fig_horario, use_container_width=True)
+        
+        # Métricas de resumen horario
+        col1, col2, col3 = st.columns(3)
+        
+        # Estadísticas por hora derivadas del mismo histograma pre-agregado.
+        # Pico/valle solo sobre horas con tráfico: las horas muertas (p.ej.
+        # madrugada) siempre suman cero y el valle reportaría 00:00 en vez
+        # de la hora menos activa con llamadas reales
+        stats_horarios = pd.Series(mat.sum(axis=0), index=range(24))
+        horas_con_trafico = stats_horarios[stats_horarios > 0]
+        if horas_con_trafico.empty:
+            st.info("Sin llamadas en el período seleccionado")
+            return
+
+        with col1:
+            hora_pico = horas_con_trafico.idxmax()
+            max_llamadas_hora = horas_con_trafico.max()
+            st.metric("🔥 Hora Pico", f"{hora_pico:02d}:00", f"{max_llamadas_hora} llamadas")
+
+        with col2:
+            hora_valle = horas_con_trafico.idxmin()
+            min_llamadas_hora = horas_con_trafico.min()
+            st.metric("🌙 Hora Valle", f"{hora_valle:02d}:00", f"{min_llamadas_hora} llamadas")
+
+        with col3:
+            # Calcular horario laboral (8-18)
+            total_llamadas = stats_horarios.sum()
+            llamadas_laborales = stats_horarios.loc[8:18].sum()
+            pct_laborales = (llamadas_laborales / total_llamadas * 100) if total_llamadas > 0 else 0
+            st.metric("🏢 % Horario Laboral", f"{pct_laborales:.1f}%")
+        
     def _mostrar_heatmap_combinado(self, df_filtrado, tipo_llamada):
         """Muestra heatmap combinado día de semana vs hora"""
         
         st.subheader(f"📊 Patrón Combinado: Día de Semana vs Hora ({tipo_llamada})")
         
-        try:
-            # Agrupar por día de semana y hora
-            agrupacion_combinada = df_filtrado.groupby(['dia_semana_num', 'hora']).size().reset_index(name='llamadas')
-            
-            # Crear matriz para el heatmap
-            matriz_combinada = agrupacion_combinada.pivot(index='dia_semana_num', columns='hora', values='llamadas')
-            matriz_combinada = matriz_combinada.fillna(0)
-            
-            # Asegurar que tenemos todas las horas
-            for hora in range(24):
-                if hora not in matriz_combinada.columns:
-                    matriz_combinada[hora] = 0
-            
-            # Ordenar columnas
-            matriz_combinada = matriz_combinada[sorted(matriz_combinada.columns)]
-            
-            # Nombres de días
-            dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-            
-            # Crear heatmap
-            fig_combinado = go.Figure(data=go.Heatmap(
-                z=matriz_combinada.values,
-                x=[f'{h:02d}:00' for h in sorted(matriz_combinada.columns)],
-                y=[dias_semana[i] for i in matriz_combinada.index],
-                colorscale='RdYlBu_r',
-                hoverinfo='all',
-                hovertemplate='<b>%{y}</b><br>%{x}<br>Llamadas: %{z}<extra></extra>',
-                colorbar=dict(title="Promedio de Llamadas")
-            ))
-            
-            fig_combinado.update_layout(
-                title=f'Mapa de Calor: Llamadas {tipo_llamada} por Día y Hora',
-                xaxis_title='Hora del Día',
-                yaxis_title='Día de la Semana',
-                height=400,
-                font=dict(size=12)
-            )
-            
-            st.plotly_chart(fig_combinado, use_container_width=True)
-            
-            # Insights del patrón combinado
-            st.subheader("🔍 Insights del Patrón Combinado")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Encontrar el momento más activo
-                max_pos = np.unravel_index(matriz_combinada.values.argmax(), matriz_combinada.values.shape)
-                dia_max = dias_semana[matriz_combinada.index[max_pos[0]]]
-                hora_max = sorted(matriz_combinada.columns)[max_pos[1]]
-                valor_max = matriz_combinada.values[max_pos]
-                
-                st.info(f"🔥 **Momento Más Activo**  \n{dia_max} a las {hora_max:02d}:00  \n{valor_max:.0f} llamadas promedio")
-            
-            with col2:
-                # Calcular concentración de llamadas
-                total_llamadas = matriz_combinada.values.sum()
-                # Top 20% de células más activas
-                flat_values = matriz_combinada.values.flatten()
-                top_20_percent = np.percentile(flat_values, 80)
-                concentracion = (flat_values >= top_20_percent).sum() / len(flat_values) * 100
-                
-                st.info(f"📊 **Concentración de Actividad**  \nEl 80% de las llamadas ocurren en  \n{concentracion:.1f}% del tiempo")
+        # Vista combinada derivada del cubo compartido (suma sobre semanas)
+        cubo, _ = _calcular_cubo_temporal(df_filtrado)
+        matriz_combinada = pd.DataFrame(cubo.sum(axis=0), index=range(7),
+                                        columns=range(24))
+
+        # Nombres de días
+        dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+        # Crear heatmap
+        fig_combinado = go.Figure(data=go.Heatmap(
+            z=matriz_combinada.values,
+            x=[f'{h:02d}:00' for h in matriz_combinada.columns],
+            y=[dias_semana[i] for i in matriz_combinada.index],
+            colorscale='RdYlBu_r',
+            hoverinfo='all',
+            hovertemplate='<b>%{y}</b><br>%{x}<br>Llamadas: %{z}<extra></extra>',
+            colorbar=dict(title="Promedio de Llamadas")
+        ))
+        
+        fig_combinado.update_layout(
+            title=f'Mapa de Calor: Llamadas {tipo_llamada} por Día y Hora',
+            xaxis_title='Hora del Día',
+            yaxis_title='Día de la Semana',
+            height=400,
+            font=dict(size=12)
+        )
+        
+        st.plotly_chart(fig_combinado, use_container_width=True)
+        
+        # Insights del patrón combinado
+        st.subheader("🔍 Insights del Patrón Combinado")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Momento más activo: argmax sobre el buffer plano; como las
+            # columnas son range(24), la posición ya es la hora
+            flat = matriz_combinada.values
+            idx_max = flat.argmax()
+            dia_i, hora_max = divmod(idx_max, 24)
+            dia_max = dias_semana[dia_i]
+            valor_max = flat.flat[idx_max]
+
+            st.info(f"🔥 **Momento Más Activo**  \n{dia_max} a las {hora_max:02d}:00  \n{valor_max:.0f} llamadas promedio")
+
+        with col2:
+            # Calcular concentración de llamadas
+            flat_values = flat.ravel()
+            # Percentil 80 vía partición O(n) en vez del sort completo
+            k = int(0.8 * flat_values.size)
+            top_20_percent = np.partition(flat_values, k)[k]
+            concentracion = (flat_values >= top_20_percent).sum() / flat_values.size * 100
             
-        except Exception as e:
-            st.error(f"Error generando heatmap combinado: {e}")
-    
+            st.info(f"📊 **Concentración de Actividad**  \nEl 80% de las llamadas ocurren en  \n{concentracion:.1f}% del tiempo")
+        
     def _generar_datos_desde_archivo_real(self, tipo_llamada):
         """Genera datos históricos desde el archivo real subido por el usuario"""
         try:
             if not self.archivo_datos_manual:
                 raise Exception("No hay archivo de datos manual disponible")
             
-            # Cargar datos reales
-            for encoding in ['utf-8', 'latin-1', 'cp1252']:
-                try:
-                    df_real = pd.read_csv(self.archivo_datos_manual, sep=';', encoding=encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
+            # Detectar encoding sobre una muestra chica y hacer UNA sola
+            # lectura completa, en vez de reintentar el parseo del archivo
+            # entero por cada encoding candidato
+            if isinstance(self.archivo_datos_manual, str):
+                encoding = _detectar_encoding(self.archivo_datos_manual)
             else:
-                raise Exception("No se pudo cargar el archivo con ningún encoding")
+                encoding = 'utf-8'
+            try:
+                df_real = pd.read_csv(self.archivo_datos_manual, sep=';', encoding=encoding)
+            except UnicodeDecodeError:
+                # latin-1 siempre decodifica; respaldo para muestras ambiguas
+                if hasattr(self.archivo_datos_manual, 'seek'):
+                    self.archivo_datos_manual.seek(0)
+                df_real = pd.read_csv(self.archivo_datos_manual, sep=';', encoding='latin-1')
             
             # Procesar fechas
             df_real['FECHA'] = pd.to_datetime(df_real['FECHA'], errors='coerce')
@@ -1695,9 +2500,15 @@ class DashboardValidacionCEAPSI:
             df_ejemplo = pd.DataFrame(datos_ejemplo)
             df_ejemplo['ds'] = pd.to_datetime(df_ejemplo['ds'])
             
-            # Guardar archivo de ejemplo para uso posterior
-            archivo_ejemplo = f"datos_prophet_{tipo_llamada.lower()}.csv"
-            df_ejemplo.to_csv(archivo_ejemplo, index=False)
+            # Guardar archivo de ejemplo para uso posterior. Parquet+Snappy:
+            # columnas tipadas (ds ya es datetime), comprimido y sin
+            # re-parseo en la próxima carga; CSV solo como fallback
+            base_ejemplo = f"datos_prophet_{tipo_llamada.lower()}"
+            if PYARROW_DISPONIBLE:
+                df_ejemplo.to_parquet(f"{base_ejemplo}.parquet",
+                                      compression='snappy', index=False)
+            else:
+                df_ejemplo.to_csv(f"{base_ejemplo}.csv", index=False)
             
             st.success(f"✅ Datos de ejemplo creados para {tipo_llamada}")
             return df_ejemplo
@@ -1722,32 +2533,48 @@ class DashboardValidacionCEAPSI:
                 freq='D'
             )
             
-            datos_completos = []
-            for i, fecha in enumerate(fechas):
-                # Simular llamadas a lo largo del día
-                for hora in range(8, 18):  # Horario laboral
-                    num_llamadas = np.random.poisson(8)  # Promedio 8 llamadas por hora
-                    
-                    for j in range(num_llamadas):
-                        # Alternar entre entrantes y salientes
-                        sentido = 'in' if (i + j) % 2 == 0 else 'out'
-                        # 80% de las llamadas atendidas
-                        atendida = 'Si' if np.random.random() < 0.8 else 'No'
-                        # Generar teléfono ficticio
-                        telefono = f"+569{np.random.randint(10000000, 99999999)}"
-                        
-                        minutos = np.random.randint(0, 60)
-                        segundos = np.random.randint(0, 60)
-                        
-                        datos_completos.append({
-                            'FECHA': fecha.strftime(f'%d-%m-%Y %02d:%02d:%02d') % (hora, minutos, segundos),
-                            'TELEFONO': telefono,
-                            'SENTIDO': sentido,
-                            'ATENDIDA': atendida,
-                            'STATUS': 'ANSWERED' if atendida == 'Si' else 'NO_ANSWER'
-                        })
-            
-            df_completo = pd.DataFrame(datos_completos)
+            # Generación vectorizada: todos los conteos Poisson de una vez y
+            # expansión con np.repeat, en lugar del triple loop con appends
+            horas_trabajo = np.arange(8, 18)  # Horario laboral
+            conteos = np.random.poisson(8, size=(len(fechas), len(horas_trabajo)))
+            planos = conteos.ravel()
+            total = int(planos.sum())
+
+            # Índices de celda (día, hora) repetidos por llamada
+            idx_celda = np.repeat(np.arange(planos.size), planos)
+            dia_idx = idx_celda // len(horas_trabajo)
+            horas_rep = horas_trabajo[idx_celda % len(horas_trabajo)]
+
+            # Posición j dentro de cada celda para alternar entrante/saliente
+            offsets = np.concatenate(([0], np.cumsum(planos)[:-1]))
+            j = np.arange(total) - np.repeat(offsets, planos)
+            sentido = np.where((dia_idx + j) % 2 == 0, 'in', 'out')
+
+            # 80% de las llamadas atendidas
+            atendida = np.where(np.random.random(total) < 0.8, 'Si', 'No')
+            minutos = np.random.randint(0, 60, total)
+            segundos = np.random.randint(0, 60, total)
+
+            # Strings armados con np.char: un solo randint para todos los
+            # teléfonos y concatenación vectorizada, sin f-strings por fila
+            nums = np.random.randint(10_000_000, 99_999_999, size=total)
+            telefonos = np.char.add('+569', nums.astype('<U8'))
+
+            dosdig = np.char.zfill(np.arange(60).astype('<U2'), 2)
+            fechas_str = np.asarray(fechas.strftime('%d-%m-%Y'), dtype='<U10')
+            fecha_col = np.char.add(
+                np.char.add(np.char.add(np.char.add(fechas_str[dia_idx], ' '),
+                                        dosdig[horas_rep]), ':'),
+                np.char.add(np.char.add(dosdig[minutos], ':'), dosdig[segundos])
+            )
+
+            df_completo = pd.DataFrame({
+                'FECHA': fecha_col,
+                'TELEFONO': telefonos,
+                'SENTIDO': sentido,
+                'ATENDIDA': atendida,
+                'STATUS': np.where(atendida == 'Si', 'ANSWERED', 'NO_ANSWER')
+            })
             st.success(f"✅ Dataset de ejemplo creado con {len(df_completo)} llamadas")
             return df_completo
             
@@ -2067,9 +2894,20 @@ class DashboardValidacionCEAPSI:
             except:
                 st.info("No se pudo cargar el análisis de feriados")
 
+@st.cache_resource
+def get_dashboard():
+    """Instancia única del dashboard compartida entre reruns.
+
+    Construirlo por rerun repetía el descubrimiento de base_path en disco;
+    como singleton, el estado (archivos subidos incluidos) persiste en la
+    sesión y los métodos cacheados siguen ignorando _self en el hash.
+    """
+    return DashboardValidacionCEAPSI()
+
+
 def main():
     """Función principal del dashboard de validación"""
-    dashboard = DashboardValidacionCEAPSI()
+    dashboard = get_dashboard()
     dashboard.ejecutar_dashboard()
 
 if __name__ == "__main__":